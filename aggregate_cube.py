@@ -0,0 +1,157 @@
+"""Pre-aggregated property x bedrooms x square-foot-band cube.
+
+Each cell holds mergeable sums (count, rent sum and sum of squares, square
+feet sum, and residual sum and sum of squares when residuals are
+available). Any roll-up or slice along cell boundaries, such as studios,
+3BR, 700-900 sqft or one property's unit mix, is answered from the cells
+without going back to row-level data. Cubes built from different exports
+merge by adding cells.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from grouped_stats import group_codes
+
+SQFT_BAND_WIDTH = 100
+
+KEY_COLUMNS = ["property_name", "bedrooms", "sqft_band"]
+
+
+class AggregateCube:
+    def __init__(self, cells, band_width=SQFT_BAND_WIDTH):
+        self.cells = cells
+        self.band_width = band_width
+
+    @classmethod
+    def build(cls, df, band_width=SQFT_BAND_WIDTH, residual_column=None):
+        """Aggregate a working set; rows missing any key are skipped."""
+        sqft = df["square_feet_numeric"].to_numpy(dtype=float)
+        keys = pd.DataFrame(
+            {
+                "property_name": df["property_name"].to_numpy(),
+                "bedrooms": df["bedrooms_numeric"].to_numpy(dtype=float),
+                "sqft_band": np.floor(sqft / band_width) * band_width,
+            }
+        )
+        codes, index = group_codes(keys, KEY_COLUMNS)
+        valid = codes >= 0
+        codes = codes[valid]
+        size = len(index)
+
+        def total(values):
+            return np.bincount(codes, weights=values[valid], minlength=size)
+
+        rent = df["market_rent_numeric"].to_numpy(dtype=float)
+        cells = index.to_frame(index=False)
+        cells["count"] = np.bincount(codes, minlength=size)
+        cells["rent_sum"] = total(rent)
+        cells["rent_sumsq"] = total(rent * rent)
+        cells["sqft_sum"] = total(sqft)
+        if residual_column is not None:
+            residual = df[residual_column].to_numpy(dtype=float)
+            cells["residual_sum"] = total(residual)
+            cells["residual_sumsq"] = total(residual * residual)
+        cells["property_name"] = cells["property_name"].astype("category")
+        return cls(cells, band_width)
+
+    def merge(self, other):
+        if other.band_width != self.band_width:
+            raise ValueError("Cannot merge cubes with different sqft band widths")
+        cells = pd.concat(
+            [
+                self.cells.astype({"property_name": str}),
+                other.cells.astype({"property_name": str}),
+            ]
+        )
+        merged = cells.groupby(KEY_COLUMNS, as_index=False).sum(min_count=1)
+        merged["property_name"] = merged["property_name"].astype("category")
+        return AggregateCube(merged, self.band_width)
+
+    def slice(self, properties=None, bedrooms=None, sqft_min=None, sqft_max=None):
+        """Cells matching the filters; sqft bounds must sit on band edges."""
+        for bound in (sqft_min, sqft_max):
+            if bound is not None and bound % self.band_width:
+                raise ValueError(
+                    f"sqft bound {bound} is not a multiple of the "
+                    f"{self.band_width} sqft band width"
+                )
+        cells = self.cells
+        mask = np.ones(len(cells), dtype=bool)
+        if properties is not None:
+            mask &= cells["property_name"].isin(properties).to_numpy()
+        if bedrooms is not None:
+            mask &= cells["bedrooms"].isin(bedrooms).to_numpy()
+        if sqft_min is not None:
+            mask &= (cells["sqft_band"] >= sqft_min).to_numpy()
+        if sqft_max is not None:
+            mask &= (cells["sqft_band"] < sqft_max).to_numpy()
+        return AggregateCube(cells[mask], self.band_width)
+
+    def rollup(self, by=()):
+        """Means and standard deviations per group of the ``by`` key columns.
+
+        With no ``by`` the whole (sliced) cube collapses to one row.
+        """
+        sums = [c for c in self.cells.columns if c not in KEY_COLUMNS]
+        keys = list(by) if by else np.zeros(len(self.cells), dtype=int)
+        totals = self.cells.groupby(keys, observed=True)[sums].sum()
+        n = totals["count"]
+        result = pd.DataFrame(index=totals.index)
+        result["count"] = n
+        result["avg_rent"] = totals["rent_sum"] / n
+        result["std_rent"] = _std(totals["rent_sum"], totals["rent_sumsq"], n)
+        result["avg_sqft"] = totals["sqft_sum"] / n
+        if "residual_sum" in totals:
+            result["avg_residual"] = totals["residual_sum"] / n
+            result["std_residual"] = _std(
+                totals["residual_sum"], totals["residual_sumsq"], n
+            )
+        return result.reset_index(drop=not by)
+
+    def save(self, path):
+        """Write the cells as an Arrow IPC file with the band width in its metadata.
+
+        The file is written to a temporary name and renamed into place, so a
+        reader memory-mapping it never sees a half-written cube.
+        """
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(self.cells, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b"sqft_band_width"] = str(self.band_width).encode()
+        table = table.replace_schema_metadata(metadata)
+        with pa.OSFile(path + ".tmp", "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        import pyarrow as pa
+
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        band_width = float(table.schema.metadata[b"sqft_band_width"])
+        if band_width.is_integer():
+            band_width = int(band_width)
+        return cls(table.to_pandas(), band_width)
+
+
+def _std(total, sumsq, n):
+    var = (sumsq - total**2 / n) / (n - 1)
+    return np.sqrt(var.clip(lower=0)).where(n > 1)
+
+
+def mix_weighted_uplift(cube, subject, comps, bedrooms=(1, 2)):
+    """Comp-minus-subject average rent per bedroom count, weighted by the
+    subject's own unit mix over ``bedrooms``."""
+    subject_rents = cube.slice([subject], bedrooms).rollup(["bedrooms"])
+    comp_rents = cube.slice(comps, bedrooms).rollup(["bedrooms"])
+    table = subject_rents.merge(
+        comp_rents, on="bedrooms", suffixes=("_subject", "_comp")
+    )
+    table["uplift"] = table["avg_rent_comp"] - table["avg_rent_subject"]
+    weighted = np.average(table["uplift"], weights=table["count_subject"])
+    return weighted, table
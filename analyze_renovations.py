@@ -1,6 +1,5 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 
 # Read the CSV data
 df_csv = pd.read_csv("../DIS_market_export.csv")
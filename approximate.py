@@ -0,0 +1,466 @@
+"""Approximate mode for iterating on thresholds and comp lists.
+
+The regression, the residual ranking and the mix-weighted uplift are run on
+a stratified sample of the leased units instead of the whole export. Strata
+are property x bedroom count x whether the row enters the regression (after
+the NOVEL exclusion and the data-quality stage), so every domain the
+analysis averages over is a union of whole strata with a known size. Each
+stratum keeps ``fraction`` of its rows (at least ``min_per_stratum``), and
+every sampled row stands for ``N_h / n_h`` rows of its stratum.
+
+The premium set uses the same significance gate as
+regression_premium_analysis.py: a property only counts as PREMIUM when its
+BH-adjusted q-value is below ``alpha``. ``--exact`` uses the same
+one-sample t-tests of the mean residual against zero as that script. On a
+sample, each property's design-based mean and standard error give a normal
+test against zero instead.
+
+Every headline number comes with a 95% bound from the stratified
+(linearized) variance of its estimator, including the finite population
+correction. The sample is drawn once per export and cached, so later runs
+with other thresholds only read a small Arrow file. ``--exact`` runs the
+same code over every row; all strata are then complete and the bounds are 0.
+
+Usage:
+    python approximate.py [--min-leases 20] [--premium-threshold 0] [--comps A B ...]
+    python approximate.py --exact
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from backends import DEFAULT_BACKEND
+from data_quality import (
+    OUTLIER_GROUPS,
+    ROBUST_Z_THRESHOLD,
+    UNIT_ATTRIBUTE_COLUMNS,
+    UNIT_ID_COLUMNS,
+    clean_leases,
+)
+from grouped_stats import group_codes
+from property_names import NAME_MAP_PATH, load_mapping
+from rent_data import EXPORT_PATH, LEASED, LEASED_NO_NOVEL, load_working_set
+from rent_model import FEATURE_NAMES
+from residual_tests import ALPHA, bh_adjust, mean_t_tests
+from results_store import ResultsStore
+
+SAMPLE_DIR = os.environ.get("RENOVATION_SAMPLE_DIR", "samples")
+SAMPLE_FRACTION = 0.02
+MIN_PER_STRATUM = 10
+
+STRATA = ["property_name", "bedrooms_numeric", "in_model"]
+SAMPLE_COLUMNS = [
+    "property_name",
+    "bedrooms_numeric",
+    "square_feet_numeric",
+    "market_rent_numeric",
+    "in_model",
+]
+
+# Two-sided 95% normal quantile
+Z_95 = 1.959963984540054
+
+SUBJECT = "ICO District"
+# Same comp set as renovation_recommendation.py
+DEFAULT_COMPS = [
+    "NOVEL Daybreak by Crescent Communities",
+    "Parc Ridge",
+    "Soleil Lofts",
+    "Upper West",
+]
+UPLIFT_BEDROOMS = (1, 2)
+TARGET_RETURN = 0.07
+
+
+def leased_units(path=EXPORT_PATH):
+    """Leased units with an ``in_model`` flag for the regression working set."""
+    leased = load_working_set(LEASED, path)
+    modelled, _ = clean_leases(LEASED_NO_NOVEL.apply(leased))
+    leased["in_model"] = leased.index.isin(modelled.index)
+    return leased[SAMPLE_COLUMNS].reset_index(drop=True)
+
+
+def strata_codes(df):
+    """Stratum code per row. group_codes gives rows without a property name
+    -1; they get strata of their own by bedroom count and ``in_model``."""
+    codes, _ = group_codes(df, STRATA)
+    unnamed = codes < 0
+    if unnamed.any():
+        extra, _ = group_codes(df[unnamed], STRATA[1:])
+        codes[unnamed] = codes.max() + 1 + extra
+    return codes
+
+
+class StratifiedSample:
+    """Sampled rows with their stratum code, stratum size and stratum sample size."""
+
+    def __init__(self, rows, population, exact=False):
+        self.rows = rows
+        self.population = population
+        self.exact = exact
+        self.weight = (rows["stratum_size"] / rows["stratum_sample"]).to_numpy()
+
+    @classmethod
+    def draw(
+        cls, df, fraction=SAMPLE_FRACTION, min_per_stratum=MIN_PER_STRATUM, seed=0
+    ):
+        """Keep a uniform random ``fraction`` of every stratum (at least
+        ``min_per_stratum`` rows, or all of a smaller stratum)."""
+        codes = strata_codes(df)
+        sizes = np.bincount(codes)
+        quota = np.minimum(
+            sizes, np.maximum(min_per_stratum, np.ceil(fraction * sizes))
+        ).astype(np.int64)
+        # Random order within each stratum; the first ``quota`` rows are kept
+        rng = np.random.default_rng(seed)
+        order = np.lexsort((rng.random(len(df)), codes))
+        starts = np.r_[0, np.cumsum(sizes)[:-1]]
+        rank = np.arange(len(df)) - starts[codes[order]]
+        keep = np.sort(order[rank < quota[codes[order]]])
+        return cls(cls._rows(df, codes, sizes, quota, keep), len(df))
+
+    @classmethod
+    def census(cls, df):
+        """Every row, as a sample whose strata are all complete."""
+        codes = strata_codes(df)
+        sizes = np.bincount(codes)
+        keep = np.arange(len(df))
+        return cls(cls._rows(df, codes, sizes, sizes, keep), len(df), exact=True)
+
+    @staticmethod
+    def _rows(df, codes, sizes, quota, keep):
+        rows = df.iloc[keep].reset_index(drop=True)
+        rows["stratum"] = codes[keep]
+        rows["stratum_size"] = sizes[codes[keep]]
+        rows["stratum_sample"] = quota[codes[keep]]
+        return rows
+
+    def save(self, path):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(self.rows, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[b"population"] = str(self.population).encode()
+        table = table.replace_schema_metadata(metadata)
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    @classmethod
+    def load(cls, path):
+        import pyarrow as pa
+
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        return cls(table.to_pandas(), int(table.schema.metadata[b"population"]))
+
+    def _strata(self):
+        codes = self.rows["stratum"].to_numpy()
+        n_strata = codes.max() + 1
+        n_h = np.bincount(codes, minlength=n_strata)
+        size_h = np.zeros(n_strata)
+        size_h[codes] = self.rows["stratum_size"].to_numpy()
+        # Finite population correction; complete strata add no variance
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.where(n_h > 1, (1 - n_h / size_h) * n_h / (n_h - 1), 0.0)
+        return codes, n_strata, n_h, scale
+
+    def variance(self, z):
+        """Variance of the estimated total of ``z`` (already weighted per row).
+
+        ``z`` may be (n,) for a scalar or (n, k) for a covariance matrix.
+        """
+        codes, n_strata, n_h, scale = self._strata()
+        z = np.asarray(z, dtype=float).reshape(len(codes), -1)
+        k = z.shape[1]
+        sums = np.column_stack(
+            [np.bincount(codes, weights=z[:, a], minlength=n_strata) for a in range(k)]
+        )
+        cov = np.empty((k, k))
+        for a in range(k):
+            for b in range(a, k):
+                cross = np.bincount(
+                    codes, weights=z[:, a] * z[:, b], minlength=n_strata
+                )
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    within = np.where(n_h > 0, cross - sums[:, a] * sums[:, b] / n_h, 0)
+                cov[a, b] = cov[b, a] = scale @ within
+        return cov[0, 0] if k == 1 else cov
+
+    def domain_variances(self, z, domains, n_domains):
+        """Variance of the total of ``z`` within each domain.
+
+        ``domains`` is a per-row domain code; every stratum must lie inside
+        a single domain, as it does for properties.
+        """
+        codes, n_strata, n_h, scale = self._strata()
+        z = np.asarray(z, dtype=float)
+        total = np.bincount(codes, weights=z, minlength=n_strata)
+        squares = np.bincount(codes, weights=z * z, minlength=n_strata)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            within = np.where(n_h > 0, squares - total**2 / n_h, 0.0)
+        stratum_domain = np.zeros(n_strata, dtype=np.int64)
+        stratum_domain[codes] = domains
+        return np.bincount(stratum_domain, weights=scale * within, minlength=n_domains)
+
+    def domain_mean(self, values, mask):
+        """Estimated mean of ``values`` over the rows in ``mask``, its size and
+        the per-row linearized contributions for variance estimation."""
+        weight = self.weight * mask
+        size = weight.sum()
+        mean = weight @ np.where(mask, values, 0.0) / size
+        z = weight * np.where(mask, values - mean, 0.0) / size
+        return mean, size, z
+
+
+def fit_regression(sample, excluded=LEASED_NO_NOVEL.exclude_properties):
+    """Weighted least squares on the regression rows, plus the coefficient
+    covariance of the sampling design."""
+    rows = sample.rows
+    in_model = rows["in_model"].to_numpy(dtype=bool)
+    mask = in_model & ~rows["property_name"].isin(excluded).to_numpy()
+    design = np.column_stack(
+        [np.ones(len(rows))]
+        + [rows[f"{name}_numeric"].to_numpy(dtype=float) for name in FEATURE_NAMES]
+    )
+    design[~mask] = 0.0
+    rent = np.where(mask, rows["market_rent_numeric"].to_numpy(dtype=float), 0.0)
+    weight = sample.weight * mask
+
+    xtwx = design.T @ (design * weight[:, None])
+    beta = np.linalg.solve(xtwx, design.T @ (weight * rent))
+    residual = np.where(mask, rent - design @ beta, np.nan)
+    # beta - beta_true ~ (X'WX)^-1 sum_i w_i x_i e_i
+    z = (design * (weight * np.nan_to_num(residual))[:, None]) @ np.linalg.inv(xtwx).T
+    return beta, sample.variance(z), residual, mask, design
+
+
+def property_residuals(sample, beta_cov, residual, mask, design):
+    """Mean residual per property with its bound, and the exact lease counts."""
+    rows = sample.rows
+    codes, labels = pd.factorize(rows["property_name"], sort=True)
+    # Rows without a property name are one more domain, left out of the table
+    codes = np.where(codes < 0, len(labels), codes)
+    labels = [*labels, None]
+    weight = sample.weight * mask
+    residual = np.nan_to_num(residual)
+    size = np.bincount(codes, weights=weight, minlength=len(labels))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.bincount(codes, weights=weight * residual, minlength=len(labels))
+        mean /= size
+        z = weight * (residual - mean[codes]) / size[codes]
+        # The shared coefficients move each property's residual by x_bar' d_beta
+        x_bar = np.column_stack(
+            [
+                np.bincount(codes, weights=weight * design[:, a], minlength=len(labels))
+                for a in range(design.shape[1])
+            ]
+        ) / size[:, None]
+    variance = sample.domain_variances(np.nan_to_num(z), codes, len(labels))
+    variance += np.einsum("gi,ij,gj->g", x_bar, beta_cov, x_bar)
+    table = pd.DataFrame(
+        {
+            "property_name": labels,
+            "lease_count": np.round(size).astype(np.int64),
+            "avg_residual": mean,
+            "bound": Z_95 * np.sqrt(variance),
+        }
+    )
+    table = table[(table["lease_count"] > 0) & table["property_name"].notna()]
+    return table.sort_values("avg_residual", ascending=False)
+
+
+def residual_significance(sample, properties, residual, mask, alpha=ALPHA):
+    """Add BH-adjusted q-values and a PREMIUM / BELOW MARKET / WITHIN NOISE
+    status to the property table, as regression_premium_analysis.py does."""
+    if sample.exact:
+        rows = sample.rows[mask]
+        codes, labels = pd.factorize(rows["property_name"], sort=True)
+        named = codes >= 0
+        tests = mean_t_tests(residual[mask][named], codes[named], len(labels))
+        pvalues = pd.Series(tests["p"].to_numpy(), index=labels)
+        pvalues = pvalues.reindex(properties["property_name"]).to_numpy()
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = properties["avg_residual"] / (properties["bound"] / Z_95)
+        pvalues = np.array(
+            [math.erfc(abs(value) / math.sqrt(2)) for value in z.to_numpy()]
+        )
+    properties = properties.assign(q=bh_adjust(pvalues))
+    significant = (properties["q"] < alpha).to_numpy()
+    properties["status"] = np.where(
+        ~significant,
+        "WITHIN NOISE",
+        np.where(properties["avg_residual"] > 0, "PREMIUM", "BELOW MARKET"),
+    )
+    return properties
+
+
+def weighted_uplift(sample, subject, comps, bedrooms=UPLIFT_BEDROOMS):
+    """Comp-minus-subject average rent per bedroom count, weighted by the
+    subject's unit mix, as in aggregate_cube.mix_weighted_uplift."""
+    rows = sample.rows
+    rent = rows["market_rent_numeric"].to_numpy(dtype=float)
+    beds = rows["bedrooms_numeric"].to_numpy(dtype=float)
+    is_subject = (rows["property_name"] == subject).to_numpy()
+    is_comp = rows["property_name"].isin(comps).to_numpy()
+
+    parts = []
+    for bedroom in bedrooms:
+        subject_mean, mix, subject_z = sample.domain_mean(
+            rent, is_subject & (beds == bedroom)
+        )
+        comp_mean, comp_size, comp_z = sample.domain_mean(
+            rent, is_comp & (beds == bedroom)
+        )
+        if mix > 0 and comp_size > 0:
+            parts.append((mix, comp_mean - subject_mean, comp_z - subject_z))
+    if not parts:
+        return np.nan, np.nan
+    total_mix = sum(mix for mix, _, _ in parts)
+    uplift = sum(mix * value for mix, value, _ in parts) / total_mix
+    z = sum(mix * part_z for mix, _, part_z in parts) / total_mix
+    return uplift, Z_95 * np.sqrt(sample.variance(z))
+
+
+def sample_path(export_path, fraction, min_per_stratum, seed):
+    """Cache path keyed on everything the sampled rows depend on: the export,
+    the name map, the loading backend, the working sets, the data-quality
+    settings and the design."""
+    with ResultsStore() as store:
+        export_hash = store.export_hash(export_path)
+    name_map = json.dumps(load_mapping(NAME_MAP_PATH), sort_keys=True)
+    key = json.dumps(
+        {
+            "export": export_hash,
+            "name_map": hashlib.sha1(name_map.encode()).hexdigest(),
+            "backend": DEFAULT_BACKEND,
+            "leased": LEASED.cache_key(),
+            "model": LEASED_NO_NOVEL.cache_key(),
+            "quality": {
+                "threshold": ROBUST_Z_THRESHOLD,
+                "outlier_groups": list(OUTLIER_GROUPS),
+                "unit_key": list(UNIT_ID_COLUMNS + UNIT_ATTRIBUTE_COLUMNS),
+            },
+            "fraction": fraction,
+            "min_per_stratum": min_per_stratum,
+            "seed": seed,
+        },
+        sort_keys=True,
+    )
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    return os.path.join(SAMPLE_DIR, f"sample_{digest}.arrow")
+
+
+def get_sample(export_path, fraction, min_per_stratum, seed):
+    """Cached sample for this export and design, drawn on first use."""
+    path = sample_path(export_path, fraction, min_per_stratum, seed)
+    if os.path.exists(path):
+        return StratifiedSample.load(path), True
+    sample = StratifiedSample.draw(
+        leased_units(export_path), fraction, min_per_stratum, seed
+    )
+    os.makedirs(SAMPLE_DIR, exist_ok=True)
+    sample.save(path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return sample, False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--export", default=EXPORT_PATH)
+    parser.add_argument("--exact", action="store_true", help="use every row")
+    parser.add_argument("--fraction", type=float, default=SAMPLE_FRACTION)
+    parser.add_argument("--min-per-stratum", type=int, default=MIN_PER_STRATUM)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-leases", type=int, default=20)
+    parser.add_argument("--premium-threshold", type=float, default=0)
+    parser.add_argument("--alpha", type=float, default=ALPHA)
+    parser.add_argument("--subject", default=SUBJECT)
+    parser.add_argument("--comps", nargs="+", default=DEFAULT_COMPS)
+    args = parser.parse_args()
+    if args.min_per_stratum < 2:
+        parser.error("--min-per-stratum must be at least 2 to estimate variances")
+
+    start = time.perf_counter()
+    if args.exact:
+        sample = StratifiedSample.census(leased_units(args.export))
+        source = "full data"
+    else:
+        sample, cached = get_sample(
+            args.export, args.fraction, args.min_per_stratum, args.seed
+        )
+        source = "cached sample" if cached else "new sample"
+    loaded = time.perf_counter()
+
+    beta, beta_cov, residual, mask, design = fit_regression(sample)
+    beta_bound = Z_95 * np.sqrt(np.diag(beta_cov))
+    properties = property_residuals(sample, beta_cov, residual, mask, design)
+    properties = residual_significance(sample, properties, residual, mask, args.alpha)
+    uplift, uplift_bound = weighted_uplift(sample, args.subject, args.comps)
+    budget_factor = 12 / TARGET_RETURN
+    done = time.perf_counter()
+
+    mode = "EXACT" if sample.exact else "APPROXIMATE"
+    print("=" * 80)
+    print(f"{mode} RUN: {len(sample.rows):,} of {sample.population:,} leased units")
+    print("=" * 80)
+    if not sample.exact:
+        print(
+            f"Stratified by property x bedrooms x regression set: "
+            f"{args.fraction:.1%} per stratum, min {args.min_per_stratum}"
+        )
+        print("Bounds are 95% intervals; rerun with --exact for the full data")
+    print(
+        f"{source} loaded in {loaded - start:.3f}s, "
+        f"estimates in {done - loaded:.3f}s"
+    )
+
+    print(f"\nREGRESSION COEFFICIENTS:")
+    for term, value, bound in zip(["intercept"] + FEATURE_NAMES, beta, beta_bound):
+        print(f"{term:<12} {value:>10.2f} ± {bound:.2f}")
+
+    test = "t-test" if sample.exact else "z-test"
+    print(f"\nPROPERTIES RANKED BY RESIDUAL:")
+    print(f"(q = BH-adjusted {test} p; WITHIN NOISE when q >= {args.alpha})")
+    for _, row in properties.iterrows():
+        gap = row["avg_residual"] - args.premium_threshold
+        # The interval crossing the threshold means the sample can't tell
+        uncertain = abs(gap) <= row["bound"] and row["status"] != "WITHIN NOISE"
+        certainty = " (uncertain)" if uncertain else ""
+        print(
+            f"{row['property_name'][:35]:<35} | "
+            f"Residual: ${row['avg_residual']:>6.0f} ± {row['bound']:<5.0f} | "
+            f"Leases: {row['lease_count']:>6} | q: {row['q']:>5.3f} | "
+            f"{row['status']}{certainty}"
+        )
+
+    premium = properties[
+        (properties["avg_residual"] > args.premium_threshold)
+        & (properties["lease_count"] >= args.min_leases)
+        & (properties["status"] == "PREMIUM")
+    ]
+    print(
+        f"\nPREMIUM SET (residual > ${args.premium_threshold:.0f}, "
+        f"min {args.min_leases} leases, {test} q < {args.alpha}): "
+        f"{len(premium)} properties"
+    )
+    for name in premium["property_name"]:
+        print(f"✓ {name}")
+
+    print(f"\nUPLIFT VS COMPS ({args.subject}; {', '.join(args.comps)}):")
+    print(f"Weighted average rent uplift: ${uplift:,.0f} ± {uplift_bound:,.0f}")
+    print(
+        f"Maximum renovation budget ({TARGET_RETURN:.0%} return): "
+        f"${uplift * budget_factor:,.0f} ± {uplift_bound * budget_factor:,.0f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Parity check of the optional backends against the pandas reference.
+
+Each backend loads and cleans the same export, builds the shared working
+sets and runs the property aggregations the reports use; every result is
+compared with pandas' and the wall time of each stage is printed. A small
+export of edge cases the reference loads (a property literally named "NA",
+"1.0" and blank ``leased`` values, infinite and unparseable numbers) is
+checked the same way. Exits non-zero on any mismatch, so it can gate
+switching RENOVATION_BACKEND.
+
+Usage:
+    python backend_parity.py [--export PATH] [--backends polars duckdb]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from backends import BACKENDS, get_backend
+from property_names import NAME_MAP_PATH, load_mapping
+from rent_data import EXPORT_PATH, LEASED, LEASED_NO_NOVEL
+
+# Columns the analysis reads after loading
+COMPARED_COLUMNS = [
+    "property_name",
+    "leased",
+    "market_rent_numeric",
+    "square_feet_numeric",
+    "bedrooms_numeric",
+]
+
+# Rows where a backend's parsing can drift from pandas' read_csv
+EDGE_CASE_EXPORT = """\
+property_name,unit_number,bedrooms,bathrooms,square_feet,market_rent,leased
+Solameer,939,3,3,"1,297","$2,091",1.0
+NA,627,1,1,742,"$1,099",1
+null,739,2,2,1e3,"$1,969",1
+Hamilton Crossing,124,2,2,980,N/A,0.0
+Parc Ridge,740,NA,3,900,"$1,969",
+Parc Ridge,741,1,1,-Infinity,inf,1
+NOVEL Daybreak by Crescent Communities,12,1,1,700,"$1,500",1
+"""
+
+WORKING_SETS = {
+    "leased": LEASED,
+    "leased_no_novel": LEASED_NO_NOVEL,
+    "leased_1_2br_600_plus": LEASED.narrow(bedrooms=(1, 2), sqft_min=600),
+}
+
+AGGREGATIONS = {
+    "by_property": (
+        "property_name",
+        {
+            "market_rent_numeric": ["mean", "median", "std", "count"],
+            "square_feet_numeric": ["mean", "sum"],
+        },
+    ),
+    "by_property_bedrooms": (
+        ["property_name", "bedrooms_numeric"],
+        {"market_rent_numeric": "mean", "square_feet_numeric": "median"},
+    ),
+}
+
+
+def compare_columns(reference, candidate, rtol):
+    """Names of the compared columns whose values differ."""
+    if len(reference) != len(candidate):
+        return [f"row count {len(reference)} != {len(candidate)}"]
+    differences = []
+    for column in COMPARED_COLUMNS:
+        left = reference[column].reset_index(drop=True)
+        right = candidate[column].reset_index(drop=True)
+        if pd.api.types.is_numeric_dtype(left):
+            left = left.to_numpy(dtype=float, na_value=np.nan)
+            right = right.to_numpy(dtype=float, na_value=np.nan)
+            same = np.isclose(left, right, rtol=rtol, equal_nan=True)
+        else:
+            same = (left == right).fillna(False) | (left.isna() & right.isna())
+        if not np.all(same):
+            differences.append(column)
+    return differences
+
+
+def compare_frames(reference, candidate, rtol):
+    """Differences between two aggregates."""
+    if not reference.index.equals(candidate.index):
+        return ["group keys"]
+    if list(reference.columns) != list(candidate.columns):
+        return ["column layout"]
+    differences = []
+    for column in reference.columns:
+        same = np.isclose(
+            reference[column].to_numpy(dtype=float),
+            candidate[column].to_numpy(dtype=float),
+            rtol=rtol,
+            equal_nan=True,
+        )
+        if not same.all():
+            differences.append(str(column))
+    return differences
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run_backend(backend, export, mapping):
+    results, timings = {}, {}
+    results["load"], timings["load"] = timed(backend.load, export, mapping)
+    for name, spec in WORKING_SETS.items():
+        results[name], timings[name] = timed(
+            backend.working_set, export, spec, mapping
+        )
+    for name, (by, spec) in AGGREGATIONS.items():
+        results[name], timings[name] = timed(
+            backend.aggregate, results["leased"], by, spec
+        )
+    return results, timings
+
+
+def check_export(export, mapping, backends, rtol):
+    """Print each backend's stages against pandas; True on any mismatch."""
+    reference, reference_timings = run_backend(get_backend("pandas"), export, mapping)
+
+    failed = False
+    for name in backends:
+        try:
+            backend = get_backend(name)
+        except ImportError as error:
+            print(f"{name:<8} skipped ({error})")
+            continue
+        results, timings = run_backend(backend, export, mapping)
+        print(f"{name} vs pandas")
+        for stage, expected in reference.items():
+            if stage in AGGREGATIONS:
+                differences = compare_frames(expected, results[stage], rtol)
+            else:
+                differences = compare_columns(expected, results[stage], rtol)
+            failed |= bool(differences)
+            status = "MISMATCH: " + ", ".join(differences) if differences else "OK"
+            print(
+                f"  {stage:<24} {reference_timings[stage]:>7.3f}s "
+                f"-> {timings[stage]:>7.3f}s  {status}"
+            )
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--export", default=EXPORT_PATH)
+    parser.add_argument("--name-map", default=NAME_MAP_PATH)
+    parser.add_argument(
+        "--backends", nargs="+", default=[b for b in BACKENDS if b != "pandas"]
+    )
+    parser.add_argument("--rtol", type=float, default=1e-9)
+    args = parser.parse_args()
+
+    mapping = load_mapping(args.name_map)
+    print(f"Export: {args.export}")
+    failed = check_export(args.export, mapping, args.backends, args.rtol)
+
+    with tempfile.TemporaryDirectory() as directory:
+        edge_export = os.path.join(directory, "edge_cases.csv")
+        with open(edge_export, "w", encoding="utf-8") as f:
+            f.write(EDGE_CASE_EXPORT)
+        print("Edge cases:")
+        failed |= check_export(edge_export, mapping, args.backends, args.rtol)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+"""Execution backends for the load, clean, filter and aggregate stages.
+
+pandas is the reference backend: the cleaning chain and the filters run
+eagerly on one core, and aggregation goes through grouped_agg. The default
+``arrow`` backend is the same apart from the load, which uses Arrow's
+multithreaded CSV parser with an explicit schema and parses rent and square
+feet with Arrow compute kernels. Two optional engines run every stage
+multithreaded:
+
+* ``polars``: the export is scanned lazily, and cleaning, the name mapping
+  and the FilterSpec predicate are one query plan, so the predicate and
+  column selection are pushed down into the CSV scan;
+* ``duckdb``: the same stages as a single SQL query over ``read_csv``, run
+  by an in-process DuckDB connection.
+
+Every backend returns pandas frames laid out like the reference, so the
+scripts downstream don't change. Pick one with ``RENOVATION_BACKEND`` (or
+the ``backend`` argument of the rent_data loaders) and check it against
+pandas with backend_parity.py. pyarrow, Polars and DuckDB are imported
+only when selected.
+"""
+
+import os
+
+import pandas as pd
+
+from grouped_stats import SUPPORTED_STATS, grouped_agg
+from property_names import apply_mapping
+
+DEFAULT_BACKEND = os.environ.get("RENOVATION_BACKEND", "arrow")
+
+# Read as text by the lazy engines, since cleaning parses them; the other
+# column types are inferred from a sample instead of a second full pass
+TEXT_COLUMNS = ("property_name", "market_rent", "square_feet", "bedrooms")
+SCHEMA_SAMPLE_ROWS = 20000
+
+# Explicit Arrow types of the export's known columns; others are inferred
+ARROW_COLUMN_TYPES = {
+    "property_name": "string",
+    "unit_number": "string",
+    "bedrooms": "string",
+    "square_feet": "string",
+    "market_rent": "string",
+    # pandas reads "1.0" and blanks here too, so int64 would reject exports
+    # the reference loads
+    "leased": "float64",
+}
+
+# pandas' default na_values, so "NA" or "null" is missing on every backend
+NULL_TOKENS = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+
+# Bytes per parse block; blocks are parsed on separate threads
+ARROW_BLOCK_SIZE = 8 << 20
+
+# What pd.to_numeric accepts once currency symbols and separators are gone,
+# matched case-insensitively; "inf" parses to infinity there too, while "nan"
+# is left unmatched and becomes null, which pandas reads back as NaN
+NUMBER_PATTERN = r"^[+-]?((\d+\.?\d*|\.\d+)(e[+-]?\d+)?|inf(inity)?)$"
+
+
+def _stat_pairs(spec):
+    """(column, stat) pairs of a grouped_agg spec, in output order."""
+    pairs = []
+    for column, stats in spec.items():
+        for name in [stats] if isinstance(stats, str) else stats:
+            if name not in SUPPORTED_STATS:
+                raise ValueError(
+                    f"Unsupported statistic {name!r}; use one of {SUPPORTED_STATS}"
+                )
+            pairs.append((column, name))
+    return pairs
+
+
+def _grouped_frame(result, by, spec):
+    """Lay out a flat ``key..., column__stat...`` result like grouped_agg."""
+    keys = [by] if isinstance(by, str) else list(by)
+    pairs = _stat_pairs(spec)
+    result = result.set_index(keys)
+    result = result[[f"{column}__{name}" for column, name in pairs]]
+    if all(isinstance(stats, str) for stats in spec.values()):
+        result.columns = [column for column, _ in pairs]
+    else:
+        result.columns = pd.MultiIndex.from_tuples(pairs)
+    if len(keys) == 1:
+        result.index.name = keys[0]
+    return result
+
+
+class PandasBackend:
+    name = "pandas"
+
+    def load(self, path, mapping=None):
+        df_csv = pd.read_csv(path, low_memory=False)
+        df_csv["property_name"] = apply_mapping(df_csv["property_name"], mapping)
+
+        df_csv["market_rent_clean"] = (
+            df_csv["market_rent"].str.replace("$", "").str.replace(",", "").str.strip()
+        )
+        df_csv["market_rent_numeric"] = pd.to_numeric(
+            df_csv["market_rent_clean"], errors="coerce"
+        )
+        df_csv["square_feet_clean"] = (
+            df_csv["square_feet"].astype(str).str.replace(",", "").str.strip()
+        )
+        df_csv["square_feet_numeric"] = pd.to_numeric(
+            df_csv["square_feet_clean"], errors="coerce"
+        )
+        df_csv["bedrooms_numeric"] = pd.to_numeric(df_csv["bedrooms"], errors="coerce")
+        return df_csv
+
+    def working_set(self, path, spec, mapping=None):
+        return spec.apply(self.load(path, mapping))
+
+    def aggregate(self, df, by, spec):
+        return grouped_agg(df, by, spec)
+
+
+class ArrowBackend(PandasBackend):
+    """pandas filtering and aggregation over a multithreaded Arrow CSV load.
+
+    The known export columns are read with explicit types, so nothing is
+    inferred for them. Rent, square feet and bedrooms are stripped and
+    parsed with Arrow compute kernels straight from the parsed buffers,
+    and their raw text columns are dropped before conversion, so the
+    cleaning never creates Python string objects.
+    """
+
+    name = "arrow"
+
+    def __init__(self):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.csv as csv
+
+        self.pa, self.pc, self.csv = pa, pc, csv
+
+    def _number(self, values, strip):
+        pc = self.pc
+        for character in strip:
+            values = pc.replace_substring(values, character, "")
+        values = pc.utf8_trim_whitespace(values)
+        # Unparseable values become null, as with errors="coerce"
+        parseable = pc.match_substring_regex(values, NUMBER_PATTERN, ignore_case=True)
+        values = pc.if_else(parseable, values, None)
+        return pc.cast(values, self.pa.float64())
+
+    def load(self, path, mapping=None):
+        pa, csv = self.pa, self.csv
+        table = csv.read_csv(
+            path,
+            read_options=csv.ReadOptions(use_threads=True, block_size=ARROW_BLOCK_SIZE),
+            convert_options=csv.ConvertOptions(
+                column_types={
+                    column: getattr(pa, type_name)()
+                    for column, type_name in ARROW_COLUMN_TYPES.items()
+                },
+                null_values=NULL_TOKENS,
+                strings_can_be_null=True,
+            ),
+        )
+        parsed = {"market_rent": "$,", "square_feet": ",", "bedrooms": ""}
+        for column, strip in parsed.items():
+            table = table.append_column(
+                f"{column}_numeric", self._number(table[column], strip)
+            )
+        table = table.drop_columns(list(parsed))
+        df_csv = table.to_pandas()
+        df_csv["property_name"] = apply_mapping(df_csv["property_name"], mapping)
+        return df_csv
+
+
+class PolarsBackend:
+    name = "polars"
+
+    def __init__(self):
+        import polars as pl
+
+        self.pl = pl
+
+    def _number(self, column, strip):
+        pl = self.pl
+        text = pl.col(column).cast(pl.Utf8)
+        for character in strip:
+            text = text.str.replace_all(character, "", literal=True)
+        # Blank and unparseable strings become null, as with errors="coerce"
+        return text.str.strip_chars().cast(pl.Float64, strict=False).fill_nan(None)
+
+    def _scan(self, path, mapping):
+        pl = self.pl
+        frame = pl.scan_csv(
+            path,
+            infer_schema_length=SCHEMA_SAMPLE_ROWS,
+            null_values=NULL_TOKENS,
+            schema_overrides={column: pl.Utf8 for column in TEXT_COLUMNS},
+        )
+        if mapping:
+            frame = frame.with_columns(pl.col("property_name").replace(mapping))
+        return frame.with_columns(
+            self._number("market_rent", "$,").alias("market_rent_numeric"),
+            self._number("square_feet", ",").alias("square_feet_numeric"),
+            self._number("bedrooms", "").alias("bedrooms_numeric"),
+        )
+
+    def _predicate(self, spec):
+        pl = self.pl
+        predicate = pl.lit(True)
+        if spec.leased_only:
+            predicate &= pl.col("leased") == 1
+        for column in spec.require:
+            predicate &= pl.col(column).is_not_null()
+        if spec.properties is not None:
+            predicate &= pl.col("property_name").is_in(list(spec.properties))
+        if spec.exclude_properties:
+            # A missing name isn't excluded, as with pandas' ~isin
+            predicate &= ~pl.col("property_name").is_in(
+                list(spec.exclude_properties)
+            ).fill_null(False)
+        if spec.bedrooms is not None:
+            predicate &= pl.col("bedrooms_numeric").is_in(
+                [float(b) for b in spec.bedrooms]
+            )
+        if spec.sqft_min is not None:
+            predicate &= pl.col("square_feet_numeric") >= spec.sqft_min
+        if spec.sqft_max is not None:
+            predicate &= pl.col("square_feet_numeric") < spec.sqft_max
+        return predicate
+
+    def load(self, path, mapping=None):
+        return self._scan(path, mapping).collect().to_pandas()
+
+    def working_set(self, path, spec, mapping=None):
+        frame = self._scan(path, mapping).filter(self._predicate(spec))
+        return frame.collect().to_pandas()
+
+    def aggregate(self, df, by, spec):
+        pl = self.pl
+        keys = [by] if isinstance(by, str) else list(by)
+        columns = {
+            "count": lambda c: pl.col(c).count(),
+            "sum": lambda c: pl.col(c).sum(),
+            "mean": lambda c: pl.col(c).mean(),
+            "std": lambda c: pl.col(c).std(ddof=1),
+            "median": lambda c: pl.col(c).median(),
+        }
+        pairs = _stat_pairs(spec)
+        used = list(dict.fromkeys(keys + [column for column, _ in pairs]))
+        result = (
+            pl.from_pandas(df[used])
+            .lazy()
+            .drop_nulls(keys)
+            .group_by(keys)
+            .agg(
+                [
+                    columns[name](column).alias(f"{column}__{name}")
+                    for column, name in pairs
+                ]
+            )
+            .sort(keys)
+            .collect()
+            .to_pandas()
+        )
+        return _grouped_frame(result, by, spec)
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class DuckDBBackend:
+    name = "duckdb"
+
+    def __init__(self):
+        import duckdb
+
+        self.conn = duckdb.connect()
+        # The progress bar would be written to stderr under the text reports
+        self.conn.execute("SET enable_progress_bar = false")
+
+    @staticmethod
+    def _number(column, strip):
+        text = f"CAST({_quote(column)} AS VARCHAR)"
+        for character in strip:
+            text = f"replace({text}, '{character}', '')"
+        # Blank and unparseable strings become NULL, as with errors="coerce"
+        value = f"TRY_CAST(trim({text}) AS DOUBLE)"
+        return f"CASE WHEN isnan({value}) THEN NULL ELSE {value} END"
+
+    def _query(self, path, mapping, spec=None):
+        text_types = ", ".join(f"'{column}': 'VARCHAR'" for column in TEXT_COLUMNS)
+        source = f"""read_csv(?, header = true, sample_size = {SCHEMA_SAMPLE_ROWS},
+                types = {{{text_types}}}, nullstr = ?)"""
+        name = "property_name"
+        if mapping:
+            # A hash join against the mapping keeps the lookup O(1) per row;
+            # the row number restores the file order the join may shuffle
+            names = pd.DataFrame(
+                {"raw_name": list(mapping), "canonical_name": list(mapping.values())}
+            )
+            self.conn.register("property_name_map", names)
+            name = "coalesce(m.canonical_name, c.property_name)"
+            source = f"""(
+                SELECT c.* EXCLUDE (row_id) REPLACE ({name} AS property_name)
+                FROM (SELECT *, row_number() OVER () AS row_id FROM {source}) c
+                LEFT JOIN property_name_map m ON c.property_name = m.raw_name
+                ORDER BY c.row_id
+            )"""
+        params = [path, NULL_TOKENS]
+        cleaned = f"""
+            SELECT *,
+                {self._number("market_rent", "$,")} AS market_rent_numeric,
+                {self._number("square_feet", ",")} AS square_feet_numeric,
+                {self._number("bedrooms", "")} AS bedrooms_numeric
+            FROM {source}
+        """
+        if spec is None:
+            return cleaned, params
+
+        where, where_params = self._predicate(spec)
+        return f"SELECT * FROM ({cleaned}) WHERE {where}", params + where_params
+
+    @staticmethod
+    def _predicate(spec):
+        clauses, params = ["TRUE"], []
+        if spec.leased_only:
+            clauses.append("leased = 1")
+        for column in spec.require:
+            clauses.append(f"{_quote(column)} IS NOT NULL")
+        if spec.properties is not None:
+            clauses.append("list_contains(?, property_name)")
+            params.append(list(spec.properties))
+        if spec.exclude_properties:
+            # A missing name isn't excluded, as with pandas' ~isin
+            clauses.append("NOT coalesce(list_contains(?, property_name), false)")
+            params.append(list(spec.exclude_properties))
+        if spec.bedrooms is not None:
+            clauses.append("list_contains(?, bedrooms_numeric)")
+            params.append([float(b) for b in spec.bedrooms])
+        if spec.sqft_min is not None:
+            clauses.append("square_feet_numeric >= ?")
+            params.append(float(spec.sqft_min))
+        if spec.sqft_max is not None:
+            clauses.append("square_feet_numeric < ?")
+            params.append(float(spec.sqft_max))
+        return " AND ".join(clauses), params
+
+    def load(self, path, mapping=None):
+        query, params = self._query(path, mapping)
+        return self.conn.execute(query, params).df()
+
+    def working_set(self, path, spec, mapping=None):
+        query, params = self._query(path, mapping, spec)
+        return self.conn.execute(query, params).df()
+
+    def aggregate(self, df, by, spec):
+        keys = [by] if isinstance(by, str) else list(by)
+        functions = {
+            "count": "count",
+            "sum": "sum",
+            "mean": "avg",
+            "std": "stddev_samp",
+            "median": "median",
+        }
+        pairs = _stat_pairs(spec)
+        used = list(dict.fromkeys(keys + [column for column, _ in pairs]))
+        frame = df[used]
+        for column, _ in pairs:
+            # NaN is a value to DuckDB but missing to pandas
+            frame = frame.assign(**{column: frame[column].astype(float)})
+        self.conn.register("grouped_input", frame)
+        try:
+            key_list = ", ".join(_quote(key) for key in keys)
+            selects = []
+            for column, name in pairs:
+                quoted = _quote(column)
+                value = f"CASE WHEN isnan({quoted}) THEN NULL ELSE {quoted} END"
+                expression = f"{functions[name]}({value})"
+                if name == "std":
+                    # stddev_samp raises on infinite input; pandas gives NaN
+                    finite = f"CASE WHEN isinf({value}) THEN NULL ELSE {value} END"
+                    expression = (
+                        f"CASE WHEN bool_or(isinf({value})) THEN 'NaN'::DOUBLE "
+                        f"ELSE stddev_samp({finite}) END"
+                    )
+                selects.append(f"{expression} AS {_quote(f'{column}__{name}')}")
+            selects = ", ".join(selects)
+            not_null = " AND ".join(f"{_quote(key)} IS NOT NULL" for key in keys)
+            result = self.conn.execute(
+                f"SELECT {key_list}, {selects} FROM grouped_input "
+                f"WHERE {not_null} GROUP BY {key_list} ORDER BY {key_list}"
+            ).df()
+        finally:
+            self.conn.unregister("grouped_input")
+        return _grouped_frame(result, by, spec)
+
+
+BACKENDS = {
+    "pandas": PandasBackend,
+    "arrow": ArrowBackend,
+    "polars": PolarsBackend,
+    "duckdb": DuckDBBackend,
+}
+
+_instances = {}
+
+
+def get_backend(name=None):
+    """Backend instance by name, defaulting to ``RENOVATION_BACKEND``."""
+    name = name or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}; use one of {sorted(BACKENDS)}")
+    if name not in _instances:
+        _instances[name] = BACKENDS[name]()
+    return _instances[name]
+
+
+def aggregate(df, by, spec, backend=None):
+    """grouped_agg on the selected backend."""
+    return get_backend(backend).aggregate(df, by, spec)
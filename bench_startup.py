@@ -0,0 +1,92 @@
+"""Import-time budget for the text-only report entry points.
+
+The scripts run their analysis at import, so instead of importing them this
+reads each script's top-level imports and times exactly those in a fresh
+interpreter. A script fails the check if its imports take longer than the
+budget or pull in a module that only the plotting stage should need.
+
+Usage:
+    python bench_startup.py [--budget 1.0] [--repeat 3]
+"""
+
+import argparse
+import ast
+import os
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+TEXT_REPORTS = [
+    "analyze_renovations.py",
+    "premium_comp_analysis.py",
+    "regression_premium_analysis.py",
+    "revised_renovation_analysis.py",
+    "renovation_recommendation.py",
+]
+
+# Heavy modules the text reports must not load at startup
+DEFERRED_MODULES = ["matplotlib", "sklearn", "scipy", "seaborn"]
+
+
+def import_statements(script):
+    with open(os.path.join(HERE, script)) as f:
+        tree = ast.parse(f.read())
+    return [
+        ast.unparse(node)
+        for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+
+
+def time_imports(statements):
+    """Wall time of a fresh interpreter running ``statements``, plus leaks."""
+    code = "\n".join(
+        statements
+        + [
+            "import sys",
+            f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))",
+        ]
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = time.perf_counter() - start
+    leaked = [m for m in result.stdout.strip().split(",") if m]
+    return elapsed, leaked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    baseline = min(time_imports([])[0] for _ in range(args.repeat))
+    print(f"Bare interpreter: {baseline:.3f}s")
+
+    failures = 0
+    for script in TEXT_REPORTS:
+        statements = import_statements(script)
+        runs = [time_imports(statements) for _ in range(args.repeat)]
+        elapsed = min(t for t, _ in runs)
+        leaked = runs[0][1]
+        ok = elapsed <= args.budget and not leaked
+        failures += not ok
+        note = f" loads {', '.join(leaked)}" if leaked else ""
+        print(
+            f"{script:<35} {elapsed:.3f}s "
+            f"{'OK' if ok else 'OVER BUDGET' if not leaked else 'FAIL'}{note}"
+        )
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
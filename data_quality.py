@@ -0,0 +1,157 @@
+"""Data-quality stage run on the leased working set before the regression.
+
+Two checks, both linear-time and vectorized:
+
+* duplicate unit records (the same unit appearing in more than one export)
+  are dropped by hashing a unit key per row and keeping the newest row for
+  each hash. The key identifies the unit, not the lease, so a unit
+  re-exported at a new rent is still a duplicate;
+* implausible rent per square foot is flagged with a robust z-score,
+  0.6745 * (x - median) / MAD, within each property and bedroom count,
+  using grouped medians so no Python loop runs per property. Groups whose
+  MAD is 0 fall back to (x - median) / (1.2533 * mean absolute deviation).
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from grouped_stats import group_codes
+
+# Columns that identify a physical unit; only those present in the export are used
+UNIT_ID_COLUMNS = ("unit_number", "unit", "unit_id")
+UNIT_ATTRIBUTE_COLUMNS = (
+    "property_name",
+    "bedrooms_numeric",
+    "bathrooms",
+    "square_feet_numeric",
+)
+# Record dates that order duplicates; without one, later rows are newer
+RECORD_DATE_COLUMNS = ("export_date", "lease_date", "date")
+
+ROBUST_Z_THRESHOLD = 3.5
+OUTLIER_GROUPS = ("property_name", "bedrooms_numeric")
+
+
+@dataclass
+class QualityReport:
+    rows_in: int
+    duplicates_removed: int
+    outliers_removed: int
+    dedupe_key: tuple
+
+    @property
+    def rows_out(self):
+        return self.rows_in - self.duplicates_removed - self.outliers_removed
+
+    def __str__(self):
+        key = ", ".join(self.dedupe_key) if self.dedupe_key else "no unit id column"
+        return (
+            f"Data quality: {self.rows_in} rows in, "
+            f"{self.duplicates_removed} duplicate units removed (key: {key}), "
+            f"{self.outliers_removed} rent/sqft outliers removed, "
+            f"{self.rows_out} rows out"
+        )
+
+
+def unit_key_columns(df):
+    """Unit key for deduplication, or () when the export has no unit id.
+
+    Without a unit identifier two genuinely different units of the same type
+    and rent look identical, so nothing is deduplicated in that case.
+    """
+    if not any(column in df.columns for column in UNIT_ID_COLUMNS):
+        return ()
+    return tuple(
+        column
+        for column in UNIT_ID_COLUMNS + UNIT_ATTRIBUTE_COLUMNS
+        if column in df.columns
+    )
+
+
+def duplicate_mask(df, key_columns):
+    """True for every row superseded by a newer record of the same unit.
+
+    The newest record is the one with the latest record date when the export
+    has one, otherwise the last one in row order (later exports are appended).
+    A date that doesn't parse ranks oldest, so it never supersedes a dated row.
+    """
+    if not key_columns:
+        return np.zeros(len(df), dtype=bool)
+    hashes = pd.util.hash_pandas_object(df[list(key_columns)], index=False)
+    date_column = next((c for c in RECORD_DATE_COLUMNS if c in df.columns), None)
+    if date_column is None:
+        return hashes.duplicated(keep="last").to_numpy()
+    dates = pd.to_datetime(df[date_column], errors="coerce").to_numpy()
+    # lexsort is stable and sorts on the last key first: undated rows, then
+    # dated rows by date
+    order = np.lexsort((dates, ~np.isnat(dates)))
+    mask = np.empty(len(df), dtype=bool)
+    mask[order] = hashes.iloc[order].duplicated(keep="last").to_numpy()
+    return mask
+
+
+def robust_z_scores(values, codes):
+    """Robust z-score of ``values`` within integer group ``codes``.
+
+    When more than half a group shares one value its MAD is 0, so that group
+    is scaled by the mean absolute deviation instead. Rows score 0 only when
+    every value in the group is the same.
+    """
+    values = pd.Series(np.asarray(values, dtype=float))
+    groups = np.asarray(codes)
+    grouped = values.groupby(groups, sort=False)
+    median = grouped.transform("median")
+    deviation = (values - median).abs()
+    by_group = deviation.groupby(groups, sort=False)
+    mad = by_group.transform("median")
+    mean_ad = by_group.transform("mean")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = 0.6745 * (values - median) / mad
+        fallback = (values - median) / (1.2533 * mean_ad)
+    z = z.where(mad > 0, fallback)
+    return z.where((mad > 0) | (mean_ad > 0), 0.0).to_numpy()
+
+
+def outlier_mask(df, threshold=ROBUST_Z_THRESHOLD, by=OUTLIER_GROUPS):
+    """True for rows whose rent per square foot is implausible for their property.
+
+    Scores are taken within property and bedroom count, since studios rent
+    for more per square foot than larger units at the same property. Rows
+    without a property name or bedroom count have no group to be scored in,
+    so only a zero, negative or missing rent per square foot flags them.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rent_per_sqft = (
+            df["market_rent_numeric"].to_numpy(dtype=float)
+            / df["square_feet_numeric"].to_numpy(dtype=float)
+        )
+    # Zero or negative square feet/rent can't be screened by z-score
+    invalid = ~np.isfinite(rent_per_sqft) | (rent_per_sqft <= 0)
+    codes, _ = group_codes(df, list(by))
+    # Rows missing a group key (code -1) have no peers to score against, so
+    # they are left unscreened rather than pooled into one group
+    unscreened = invalid | (codes < 0)
+    z = robust_z_scores(np.where(unscreened, np.nan, rent_per_sqft), codes)
+    return invalid | (np.abs(np.nan_to_num(z)) > threshold)
+
+
+def clean_leases(df, threshold=ROBUST_Z_THRESHOLD):
+    """Drop duplicate units, then rent/sqft outliers; return the frame and a report.
+
+    Outliers are scored on the deduplicated rows only, and the two masks are
+    combined so the frame is copied once.
+    """
+    key_columns = unit_key_columns(df)
+    keep = ~duplicate_mask(df, key_columns)
+    screened = df[["market_rent_numeric", "square_feet_numeric", *OUTLIER_GROUPS]]
+    outliers = np.zeros(len(df), dtype=bool)
+    outliers[keep] = outlier_mask(screened[keep], threshold)
+    report = QualityReport(
+        rows_in=len(df),
+        duplicates_removed=int((~keep).sum()),
+        outliers_removed=int(outliers.sum()),
+        dedupe_key=key_columns,
+    )
+    return df[keep & ~outliers].copy(), report
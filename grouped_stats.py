@@ -0,0 +1,176 @@
+"""Grouped summary statistics for the property tables.
+
+Counts, means and standard deviations are reduced with ``np.bincount`` over
+integer group codes, so each value column is scanned once. ``grouped_agg``
+works on a whole frame and computes exact medians by partitioning each
+group's values in place, with the rows grouped by a single sort.
+
+On a single string key the cost is dominated by factorizing the key, which
+pandas' groupby pays as well, so ``grouped_agg`` runs at about pandas
+``.agg`` speed rather than several times faster.
+"""
+
+import numpy as np
+import pandas as pd
+
+SUPPORTED_STATS = ("count", "sum", "mean", "std", "median")
+
+
+def _code_dtype(n_groups):
+    if n_groups <= np.iinfo(np.uint8).max:
+        return np.uint8
+    if n_groups <= np.iinfo(np.uint16).max:
+        return np.uint16
+    return np.int64
+
+
+def group_order(codes, n_groups):
+    """Row order that groups ``codes`` together, plus where each group starts."""
+    # Narrow codes let numpy use its O(n) radix sort
+    order = np.argsort(codes.astype(_code_dtype(n_groups)), kind="stable")
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    return order, starts
+
+
+def group_codes(df, by):
+    """Factorize the key columns into one dense, sorted integer code per row."""
+    keys = [by] if isinstance(by, str) else list(by)
+    codes = np.zeros(len(df), dtype=np.int64)
+    missing = np.zeros(len(df), dtype=bool)
+    uniques = []
+    for key in keys:
+        column = df[key]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            # Categoricals are already factorized; only the order needs fixing
+            rank = np.argsort(np.argsort(column.cat.categories, kind="stable"))
+            key_uniques = column.cat.categories.sort_values()
+            key_codes = np.where(column.cat.codes < 0, -1, rank[column.cat.codes])
+        else:
+            key_codes, key_uniques = pd.factorize(column, sort=True)
+            if len(keys) == 1:
+                # Already dense over the observed values, nothing to compress
+                return key_codes.astype(np.int64, copy=False), pd.Index(
+                    key_uniques, name=key
+                )
+        missing |= key_codes < 0
+        codes = codes * len(key_uniques) + key_codes
+        uniques.append(key_uniques)
+
+    # Compress the cartesian code space down to the groups that occur
+    space = int(np.prod([len(u) for u in uniques]))
+    if space <= 4 * len(df) + 1024:
+        present = np.flatnonzero(np.bincount(codes[~missing], minlength=space))
+        lookup = np.full(space, -1, dtype=np.int64)
+        lookup[present] = np.arange(len(present))
+        codes = np.where(missing, -1, lookup[np.where(missing, 0, codes)])
+    else:
+        present, codes_present = np.unique(codes[~missing], return_inverse=True)
+        codes = np.full(len(df), -1, dtype=np.int64)
+        codes[~missing] = codes_present
+
+    sizes = [len(u) for u in uniques]
+    positions = np.unravel_index(present, sizes) if sizes else ()
+    if len(keys) == 1:
+        index = pd.Index(uniques[0][positions[0]], name=keys[0])
+    else:
+        index = pd.MultiIndex.from_arrays(
+            [u[p] for u, p in zip(uniques, positions)], names=keys
+        )
+    return codes, index
+
+
+def _group_medians(values, codes, size, grouping=None):
+    """Exact per-group medians, partitioning each group's run in place."""
+    result = np.full(size, np.nan)
+    if len(values) == 0:
+        return result
+    order, starts = grouping or group_order(codes, size)
+    grouped = values[order]
+    ends = np.r_[starts[1:], len(grouped)]
+    for group, start, end in zip(codes[order[starts]], starts, ends):
+        chunk = grouped[start:end]
+        mid = len(chunk) // 2
+        if len(chunk) % 2:
+            chunk.partition(mid)
+            result[group] = chunk[mid]
+        else:
+            chunk.partition([mid - 1, mid])
+            result[group] = (chunk[mid - 1] + chunk[mid]) / 2
+    return result
+
+
+def grouped_agg(df, by, spec):
+    """Drop-in for ``df.groupby(by).agg(spec)`` on count/sum/mean/std/median.
+
+    The keys are factorized once and every column's moments are reduced with
+    one or two weighted bincounts over the shared codes. Medians are exact:
+    the rows are put in group order once and each group's run is partitioned.
+    Returns the same column layout pandas would, so the existing column
+    renames keep working.
+    """
+    codes, index = group_codes(df, by)
+    size = len(index)
+    keyed = codes >= 0
+    all_keyed = keyed.all()
+    if not all_keyed:
+        codes = codes[keyed]
+    counts = np.bincount(codes, minlength=size)
+    grouping = None
+    columns = {}
+    for column, stats in spec.items():
+        stats = [stats] if isinstance(stats, str) else list(stats)
+        unsupported = [name for name in stats if name not in SUPPORTED_STATS]
+        if unsupported:
+            raise ValueError(
+                f"Unsupported statistic {unsupported[0]!r}; "
+                f"use one of {SUPPORTED_STATS}"
+            )
+        values = df[column].to_numpy()
+        if values.dtype != np.float64:
+            values = df[column].to_numpy(dtype=float, na_value=np.nan)
+        if not all_keyed:
+            values = values[keyed]
+        column_codes, count = codes, counts
+        missing = np.isnan(values)
+        if missing.any():
+            column_codes, values = codes[~missing], values[~missing]
+            count = np.bincount(column_codes, minlength=size)
+
+        # Sums for the variance are taken around a fixed shift to keep it stable;
+        # the shift must be finite or an infinite first value poisons every group
+        shift = 0.0
+        if "std" in stats and len(values):
+            shift = values[0]
+            if not np.isfinite(shift):
+                finite = values[np.isfinite(values)]
+                shift = finite[0] if len(finite) else 0.0
+        shifted = values - shift if shift else values
+        total = np.bincount(column_codes, weights=shifted, minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for name in stats:
+                if name == "count":
+                    result = count.copy()
+                elif name == "sum":
+                    result = total + shift * count
+                elif name == "mean":
+                    result = total / count + shift
+                elif name == "std":
+                    sumsq = np.bincount(
+                        column_codes, weights=shifted * shifted, minlength=size
+                    )
+                    var = (sumsq - total**2 / count) / (count - 1)
+                    result = np.sqrt(np.maximum(var, 0.0))
+                else:
+                    if column_codes is codes:
+                        if grouping is None:
+                            grouping = group_order(codes, size)
+                        result = _group_medians(values, codes, size, grouping)
+                    else:
+                        result = _group_medians(values, column_codes, size)
+                columns[(column, name)] = result
+    result = pd.DataFrame(columns, index=index)
+    if all(isinstance(stats, str) for stats in spec.values()):
+        # pandas only nests the column labels when some column gets a list
+        result.columns = result.columns.get_level_values(0)
+    return result
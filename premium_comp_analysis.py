@@ -1,33 +1,17 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
+from backends import aggregate
+from rent_data import LEASED, load_working_set
+from result_sink import ResultSink
 
-# Read the CSV data
-df_csv = pd.read_csv('../DIS_market_export.csv', low_memory=False)
-
-# Clean market_rent column and convert to numeric
-df_csv['market_rent_clean'] = df_csv['market_rent'].str.replace('$', '').str.replace(',', '').str.strip()
-df_csv['market_rent_numeric'] = pd.to_numeric(df_csv['market_rent_clean'], errors='coerce')
-
-# Clean square_feet column and convert to numeric
-df_csv['square_feet_clean'] = df_csv['square_feet'].astype(str).str.replace(',', '').str.strip()
-df_csv['square_feet_numeric'] = pd.to_numeric(df_csv['square_feet_clean'], errors='coerce')
-
-# Clean bedrooms column
-df_csv['bedrooms_numeric'] = pd.to_numeric(df_csv['bedrooms'], errors='coerce')
-
-# Focus on leased units only (where leased=1) - these represent actual executed rents
-leased_df = df_csv[df_csv['leased'] == 1].copy()
-
-# Remove rows with missing critical data
-leased_df = leased_df.dropna(subset=['market_rent_numeric', 'bedrooms_numeric', 'square_feet_numeric'])
+# Read the CSV data, clean rent, square feet and bedrooms, and focus on leased
+# units only (where leased=1) with complete data - these represent actual executed rents
+leased_df = load_working_set(LEASED)
 
 print("=== PHASE 1: PREMIUM COMPS ANALYSIS ===")
 print("\n1. Rent Analysis by Property (Leased Units Only)")
 print("-" * 60)
 
 # Calculate average rent by property and bedroom count for leased units
-rent_by_property = leased_df.groupby(['property_name', 'bedrooms_numeric']).agg({
+rent_by_property = aggregate(leased_df, ['property_name', 'bedrooms_numeric'], {
     'market_rent_numeric': ['mean', 'median', 'count'],
     'square_feet_numeric': 'mean'
 }).round(2)
@@ -105,8 +89,11 @@ print("\n" + "="*60)
 print("LEASING VOLUME ANALYSIS")
 print("="*60)
 
+# Lease counts per property, counted once instead of slicing a frame per property
+lease_counts = leased_df['property_name'].value_counts()
+
 # Calculate District's leasing requirements (mentioned as 100-150 leases per year)
-district_total_leases = len(leased_df[leased_df['property_name'] == 'ICO District'])
+district_total_leases = lease_counts.get('ICO District', 0)
 print(f"\nICO District Total Leased Units in Dataset: {district_total_leases}")
 
 # Analyze premium comp leasing volumes
@@ -115,12 +102,29 @@ premium_properties = ['NOVEL Daybreak by Crescent Communities', 'Hamilton Crossi
                      'Parc Ridge', 'Solameer', 'Upper West', 'Soleil Lofts']
 
 for prop in premium_properties:
-    prop_leases = len(leased_df[leased_df['property_name'] == prop])
+    prop_leases = lease_counts.get(prop, 0)
     if prop_leases > 0:
         multiple = prop_leases / district_total_leases if district_total_leases > 0 else 0
         print(f"  {prop}: {prop_leases} leases ({multiple:.1f}x District)")
 
-print(f"\nTotal Premium Comp Leases: {sum([len(leased_df[leased_df['property_name'] == prop]) for prop in premium_properties])}")
-total_premium_leases = sum([len(leased_df[leased_df['property_name'] == prop]) for prop in premium_properties])
+total_premium_leases = sum(lease_counts.get(prop, 0) for prop in premium_properties)
+print(f"\nTotal Premium Comp Leases: {total_premium_leases}")
 district_market_share = district_total_leases / (district_total_leases + total_premium_leases) * 100
 print(f"District's Share of Premium + District Market: {district_market_share:.1f}%")
+
+# Structured copies of the report tables for downstream consumers
+sink = ResultSink(__file__)
+sink.write_table('rent_by_property', rent_by_property)
+summary = {
+    'district_total_leases': district_total_leases,
+    'lease_counts': lease_counts[lease_counts.index.isin(premium_properties)].to_dict(),
+    'total_premium_leases': total_premium_leases,
+    'district_market_share_pct': district_market_share,
+}
+if not district_1br.empty:
+    sink.write_table('premium_1br', premium_1br.assign(premium=premium_1br['avg_rent'] - district_1br_rent))
+    summary['district_1br_rent'] = district_1br_rent
+if not district_2br.empty:
+    sink.write_table('premium_2br', premium_2br.assign(premium=premium_2br['avg_rent'] - district_2br_rent))
+    summary['district_2br_rent'] = district_2br_rent
+sink.write_summary(summary)
@@ -0,0 +1,243 @@
+"""Property-name resolution for merging exports from different vendors.
+
+The same property shows up as "NOVEL Daybreak by Crescent Communities",
+"Novel Daybreak" or "NOVEL DAYBREAK APTS" depending on the source. Names are
+normalized, split into character trigrams and indexed by trigram; only names
+that share a (not too common) trigram block are compared, so the work grows
+with the number of near-duplicates rather than with all pairs. Matches are
+clustered and every raw name maps to its cluster's canonical name. Names
+the scripts refer to by exact string (PINNED_NAMES, plus any ``--pin`` or
+``--pin-export`` names) are never renamed and win as canonical.
+
+The mapping is saved as JSON (hand-editable) and applied on load with a
+dictionary lookup over the distinct names.
+
+Usage:
+    python property_names.py build a.csv b.csv [-o property_name_map.json]
+        [--pin NAME ...] [--pin-export primary.csv]
+"""
+
+import argparse
+import json
+import os
+import re
+import unicodedata
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+NAME_MAP_PATH = os.environ.get("PROPERTY_NAME_MAP", "property_name_map.json")
+
+# Words that vary between vendors without changing which property is meant
+NOISE_PATTERN = re.compile(
+    r"\b(apartment homes|apartments|apartment|apts|apt|by crescent communities"
+    r"|the|at|and)\b"
+)
+
+# Names the scripts refer to by exact string; a mapping must never rename them,
+# or filters like LEASED_NO_NOVEL and the comp lists silently stop matching
+PINNED_NAMES = (
+    "Hamilton Crossing",
+    "ICO District",
+    "NOVEL Daybreak by Crescent Communities",
+    "Parc Ridge",
+    "Solameer",
+    "Soleil Lofts",
+    "Upper West",
+)
+
+# Display labels for charts drop owner prefixes and marketing suffixes
+DISPLAY_STRIP = [" Apartments", "ICO ", " at Daybreak", " by Crescent Communities"]
+
+NGRAM = 3
+SIMILARITY_THRESHOLD = 0.7
+MAX_BLOCK_SIZE = 200
+
+
+def normalize_name(name):
+    """Lowercase, accent-free, punctuation-free name without noise words."""
+    name = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode()
+    name = re.sub(r"[^a-z0-9 ]+", " ", name.lower().replace("&", " and "))
+    name = NOISE_PATTERN.sub(" ", name)
+    return " ".join(name.split())
+
+
+def display_name(name, max_length=15):
+    """Short chart label for a property name."""
+    for fragment in DISPLAY_STRIP:
+        name = name.replace(fragment, "")
+    if len(name) > max_length:
+        name = name[:max_length] + "..."
+    return name
+
+
+def ngrams(text, n=NGRAM):
+    padded = f" {text} "
+    return {padded[i : i + n] for i in range(max(len(padded) - n + 1, 1))}
+
+
+class _UnionFind:
+    def __init__(self, size):
+        self.parent = np.arange(size)
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def candidate_pairs(gram_sets, max_block_size=MAX_BLOCK_SIZE):
+    """Pairs of names sharing at least one trigram block, with shared counts.
+
+    Trigrams carried by more than ``max_block_size`` names (" th", "ge ")
+    say little about identity and are skipped as blocks.
+    """
+    vocabulary = {}
+    name_ids, gram_ids = [], []
+    for i, grams in enumerate(gram_sets):
+        for gram in grams:
+            name_ids.append(i)
+            gram_ids.append(vocabulary.setdefault(gram, len(vocabulary)))
+    name_ids = np.asarray(name_ids, dtype=np.int64)
+    gram_ids = np.asarray(gram_ids, dtype=np.int64)
+
+    block_sizes = np.bincount(gram_ids, minlength=len(vocabulary))
+    keep = (block_sizes[gram_ids] >= 2) & (block_sizes[gram_ids] <= max_block_size)
+    name_ids, gram_ids = name_ids[keep], gram_ids[keep]
+    order = np.argsort(gram_ids, kind="stable")
+    name_ids, gram_ids = name_ids[order], gram_ids[order]
+    starts = np.flatnonzero(np.r_[True, gram_ids[1:] != gram_ids[:-1]])
+
+    left, right = [], []
+    for block in np.split(name_ids, starts[1:]):
+        i, j = np.triu_indices(len(block), k=1)
+        left.append(block[i])
+        right.append(block[j])
+    if not left:
+        return np.empty((0, 2), dtype=np.int64), np.empty(0, dtype=np.int64)
+    left, right = np.concatenate(left), np.concatenate(right)
+    low, high = np.minimum(left, right), np.maximum(left, right)
+    pair_keys, shared = np.unique(low * len(gram_sets) + high, return_counts=True)
+    pairs = np.column_stack(np.divmod(pair_keys, len(gram_sets)))
+    return pairs, shared
+
+
+def build_mapping(names, counts=None, threshold=SIMILARITY_THRESHOLD, pinned=()):
+    """Map every raw name to a canonical name.
+
+    Names whose normalized forms match exactly, or whose trigram Jaccard
+    similarity is at least ``threshold``, end up in the same cluster. The
+    canonical name of a cluster is its most frequent raw name (by ``counts``,
+    e.g. lease rows), ties going to the shortest.
+
+    ``pinned`` names, such as those the scripts refer to by exact string,
+    always map to themselves and win as canonical over unpinned names in
+    their cluster. They take part in the clustering even when no export
+    spells them that way, so vendor variants still resolve to them.
+    """
+    pinned = set(pinned)
+    names = list(dict.fromkeys([*names, *sorted(pinned)]))
+    counts = counts or {}
+    normalized = [normalize_name(name) for name in names]
+
+    # Exact matches after normalization collapse before any trigram work
+    keys = list(dict.fromkeys(normalized))
+    key_index = {key: i for i, key in enumerate(keys)}
+    gram_sets = [ngrams(key) for key in keys]
+
+    clusters = _UnionFind(len(keys))
+    pairs, shared = candidate_pairs(gram_sets)
+    sizes = np.array([len(grams) for grams in gram_sets])
+    if len(pairs):
+        # Size ratio bounds the Jaccard from above and the blocked trigrams
+        # bound it from below; only plausible pairs get the exact comparison
+        bound = shared / (sizes[pairs[:, 0]] + sizes[pairs[:, 1]] - shared)
+        upper = np.minimum(sizes[pairs[:, 0]], sizes[pairs[:, 1]]) / np.maximum(
+            sizes[pairs[:, 0]], sizes[pairs[:, 1]]
+        )
+        for i, j in pairs[(upper >= threshold) & (bound >= threshold / 2)]:
+            a, b = gram_sets[i], gram_sets[j]
+            if len(a & b) / len(a | b) >= threshold:
+                clusters.union(i, j)
+
+    members = {}
+    for name, key in zip(names, normalized):
+        members.setdefault(clusters.find(key_index[key]), []).append(name)
+    mapping = {}
+    for group in members.values():
+        candidates = [name for name in group if name in pinned] or group
+        canonical = min(candidates, key=lambda n: (-counts.get(n, 0), len(n), n))
+        for name in group:
+            mapping[name] = name if name in pinned else canonical
+    return mapping
+
+
+def save_mapping(mapping, path=NAME_MAP_PATH):
+    # Only names that change are stored; everything else maps to itself
+    changed = {raw: canon for raw, canon in mapping.items() if raw != canon}
+    with open(path, "w") as f:
+        json.dump(changed, f, indent=2, sort_keys=True)
+
+
+def load_mapping(path=NAME_MAP_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def apply_mapping(names, mapping):
+    """Canonical names for a column, looking up each distinct name once."""
+    if not mapping:
+        return names
+    codes, uniques = pd.factorize(names)
+    canonical = np.array([mapping.get(name, name) for name in uniques], dtype=object)
+    result = pd.Series(
+        np.where(codes >= 0, canonical[codes], None),
+        index=names.index,
+        name=names.name,
+    )
+    if isinstance(names.dtype, pd.CategoricalDtype):
+        return result.astype("category")
+    return result.astype(names.dtype)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build a mapping from exports")
+    build.add_argument("exports", nargs="+")
+    build.add_argument("--pin", nargs="+", default=[], help="more names to keep")
+    build.add_argument(
+        "--pin-export", nargs="+", default=[], help="keep every name in these exports"
+    )
+    build.add_argument("-o", "--output", default=NAME_MAP_PATH)
+    build.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD)
+    args = parser.parse_args()
+
+    counts = Counter()
+    for export in args.exports:
+        names = pd.read_csv(export, usecols=["property_name"])["property_name"]
+        counts.update(names.value_counts().to_dict())
+    pinned = set(PINNED_NAMES) | set(args.pin)
+    for export in args.pin_export:
+        names = pd.read_csv(export, usecols=["property_name"])["property_name"]
+        pinned.update(names.dropna().unique())
+    mapping = build_mapping(list(counts), counts, args.threshold, pinned)
+    save_mapping(mapping, args.output)
+    merged = sum(raw != canonical for raw, canonical in mapping.items())
+    print(f"{len(counts)} distinct names, {merged} mapped onto another name")
+    print(f"Mapping written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
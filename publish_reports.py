@@ -0,0 +1,381 @@
+"""Render the renovation reports from stored results, one pair per subject.
+
+The reports are filled in from the latest regression_premium_analysis.py run
+in the results store (or ``--run-id``), so publishing never re-reads the
+export or refits the model. Each subject property gets a factual and a final
+report built from ``report_templates/``; every other property in the run's
+premium set, which only holds properties whose mean residual passes the
+run's BH-adjusted t-test against zero, is a comparable. Reports are written
+concurrently. Each residual chart is rendered once per distinct chart into the ignored
+``render_cache/`` and copied to ``charts/`` next to the reports, which is
+what the reports link to, so re-rendered docs can be committed with their
+charts.
+
+Usage:
+    python publish_reports.py [--subjects "ICO District" ...] [--all]
+    python publish_reports.py --output-dir .   # re-render the committed docs
+"""
+
+import argparse
+import filecmp
+import hashlib
+import json
+import os
+import re
+import shutil
+import string
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from property_names import display_name
+from results_store import DEFAULT_DB_PATH, ResultsStore
+
+SOURCE_SCRIPT = "regression_premium_analysis.py"
+TEMPLATE_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "report_templates"
+)
+TEMPLATES = {"FACTUAL": "factual.md", "FINAL": "final.md"}
+DEFAULT_OUTPUT_DIR = os.environ.get("RENOVATION_REPORT_DIR", "reports")
+CACHE_DIR = "render_cache"
+CHART_DIR = "charts"
+
+DEFAULT_SUBJECTS = ["ICO District"]
+RENOVATION_BUDGET = 6500
+TARGET_RETURN = 0.07
+# Below this monthly gap the upside is described as limited
+LIMITED_UPSIDE = 50
+
+# matplotlib isn't thread-safe, so charts render one at a time
+_render_lock = threading.Lock()
+
+
+def money(value, sign=False):
+    text = f"${abs(value):,.0f}"
+    if sign:
+        return ("+" if value >= 0 else "-") + text
+    return text if value >= 0 else "-" + text
+
+
+def report_slug(name, max_length=1000):
+    """File-name stem for a property, e.g. "ICO District" -> "DISTRICT"."""
+    return re.sub(r"[^A-Z0-9]+", "_", display_name(name, max_length).upper()).strip("_")
+
+
+def output_names(subjects):
+    """Report stem per subject, falling back to the full name on collisions."""
+    short = {subject: report_slug(subject) for subject in subjects}
+    counts = Counter(short.values())
+    return {
+        subject: stem
+        if counts[stem] == 1
+        else re.sub(r"[^A-Z0-9]+", "_", subject.upper()).strip("_")
+        for subject, stem in short.items()
+    }
+
+
+def load_results(store, run_id=None):
+    """Everything the templates need from one stored run."""
+    if run_id is None:
+        run_id = store.latest_run(SOURCE_SCRIPT)
+    run = store.run(run_id) if run_id is not None else None
+    if run is None:
+        raise SystemExit(
+            f"No stored run found in {store.path}; run {SOURCE_SCRIPT} first"
+        )
+    properties = store.property_table(run_id)
+    if "avg_residual" not in properties:
+        raise SystemExit(f"Run {run_id} ({run['script']}) has no property residuals")
+    if "t_q" not in properties:
+        raise SystemExit(
+            f"Run {run_id} ({run['script']}) has no significance tests; "
+            f"publish from a {SOURCE_SCRIPT} run"
+        )
+    return {
+        "run": run,
+        "properties": properties.set_index("property_name"),
+        "coefficients": store.coefficients(run_id),
+        "premium_set": store.premium_set(run_id),
+    }
+
+
+def chart_path(output_dir, residuals, subject, comps):
+    """Cached residual bar chart for one subject, rendered on first use.
+
+    Returns the path relative to ``output_dir`` and whether it was rendered.
+    """
+    ordered = residuals.sort_values()
+    data = {
+        "names": list(ordered.index),
+        "residuals": [round(float(v), 2) for v in ordered],
+        "subject": subject,
+        "comps": sorted(comps),
+    }
+    key = hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+    relative = os.path.join(CACHE_DIR, f"{key}.png")
+    path = os.path.join(output_dir, relative)
+    if os.path.exists(path):
+        return relative, False
+
+    with _render_lock:
+        if os.path.exists(path):
+            return relative, False
+        # Deferred so publishing from a warm cache never imports matplotlib
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        colors = [
+            "#d62728" if name == subject else "#2ca02c" if name in comps else "#7f7f7f"
+            for name in ordered.index
+        ]
+        fig = Figure(figsize=(8, 0.35 * len(ordered) + 1.5))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        ax.barh([display_name(name) for name in ordered.index], ordered, color=colors)
+        ax.axvline(0, color="black", linewidth=0.8)
+        ax.set_xlabel("Average residual ($/month vs. regression)")
+        ax.set_title(f"{display_name(subject)} vs. premium comps (green)")
+        fig.tight_layout()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fig.savefig(path + ".tmp.png", dpi=100)
+        os.replace(path + ".tmp.png", path)
+    return relative, True
+
+
+def publish_chart(output_dir, cached, filename):
+    """Copy a cached chart to ``charts/`` so the reports never link into the cache.
+
+    Returns the path relative to ``output_dir``.
+    """
+    relative = os.path.join(CHART_DIR, filename)
+    path = os.path.join(output_dir, relative)
+    source = os.path.join(output_dir, cached)
+    if os.path.exists(path) and filecmp.cmp(source, path, shallow=False):
+        return relative
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    shutil.copyfile(source, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return relative
+
+
+def subject_context(results, subject, renovation_budget):
+    """Template values for one subject, or None without comparables."""
+    properties = results["properties"]
+    coefficients = results["coefficients"]
+    run = results["run"]
+    comps = [name for name in results["premium_set"] if name != subject]
+    if not comps:
+        return None
+    row = properties.loc[subject]
+    comp_rows = properties.loc[comps].sort_values("avg_residual", ascending=False)
+
+    residual = row["avg_residual"]
+    comp_residual = comp_rows["avg_residual"].mean()
+    uplift = comp_residual - residual
+    annual_increase = uplift * 12
+    max_budget = annual_increase / TARGET_RETURN
+    actual_roi = annual_increase / renovation_budget * 100
+    premium_leases = comp_rows["lease_count"].sum()
+    subject_share = row["lease_count"] / (premium_leases + row["lease_count"]) * 100
+    sufficient = max_budget >= renovation_budget
+    proceed = uplift > 0 and sufficient
+    short_name = display_name(subject, max_length=1000)
+
+    excluded = run["params"].get("filter", {}).get("exclude_properties") or []
+    exclusion = (
+        " (excluding " + ", ".join(display_name(name) for name in excluded) + ")"
+        if excluded
+        else ""
+    )
+    premium_table = "\n".join(
+        f"| **{name}** | **{money(r['avg_residual'], sign=True)}** "
+        f"| {money(r['avg_actual_rent'])} | {money(r['avg_predicted_rent'])} "
+        f"| {r['lease_count']:.0f} | {r['t_q']:.4f} |"
+        for name, r in comp_rows.iterrows()
+    )
+
+    above = residual >= 0
+    upside_word = "limited" if uplift < LIMITED_UPSIDE else "meaningful"
+    budget_text = money(renovation_budget)
+    findings = [
+        (
+            f"**{short_name} is not underperforming** - already "
+            f"{money(abs(residual))} above regression expectations"
+            if above
+            else f"**{short_name} is underperforming** - "
+            f"{money(abs(residual))} below regression expectations"
+        ),
+        f"**{upside_word.capitalize()} mathematical upside** - {money(uplift)}/month "
+        "potential based on premium comp average",
+        (
+            f"**Sufficient renovation budget** - {money(max_budget)} budget within "
+            f"{budget_text} renovation capacity"
+            if sufficient
+            else f"**Insufficient renovation budget** - {money(max_budget)} budget "
+            f"below {budget_text} renovation cost"
+        ),
+        f"**Strong premium comp presence** - {len(comps)} properties with "
+        f"significant premiums (t-test q < {run['params'].get('alpha', '')}) and "
+        "lease volume",
+    ]
+    if proceed:
+        recommendation = "PROCEED WITH RENOVATIONS"
+        rationale = [
+            f"{short_name} can achieve {money(uplift)}/month rent increase based on "
+            "premium comp analysis",
+            f"7% ROI threshold met with {money(max_budget)} renovation budget "
+            f"(within {budget_text} capacity)",
+            "Mathematical analysis supports renovation economics",
+            f"{len(comps)} premium comparables validate higher rent potential",
+        ]
+        final_summary = (
+            f"Analysis supports renovations with **{money(uplift)}/month rent increase "
+            f"potential** and **{actual_roi:.1f}% ROI** on {budget_text} renovation "
+            "budget."
+        )
+    else:
+        recommendation = "DO NOT PROCEED WITH RENOVATIONS"
+        rationale = [
+            f"Premium comp analysis supports only {money(uplift)}/month rent increase",
+            f"7% ROI threshold not met: {money(max_budget)} budget is below the "
+            f"{budget_text} renovation cost",
+            "Focus on operations, marketing and tenant retention",
+            f"{len(comps)} premium comparables in the dataset",
+        ]
+        final_summary = (
+            f"Analysis does not support renovations: **{money(uplift)}/month rent "
+            f"increase potential** gives **{actual_roi:.1f}% ROI** on {budget_text} "
+            "renovation budget."
+        )
+
+    return {
+        "subject": subject,
+        "short_name": short_name,
+        "comps": comps,
+        "lease_total": f"{properties['lease_count'].sum():,.0f}",
+        "property_count": len(properties),
+        "exclusion": exclusion,
+        "r2": f"{coefficients['r2']:.3f}",
+        "r2_pct": f"{coefficients['r2'] * 100:.1f}",
+        "intercept": money(coefficients["intercept"]),
+        "sqft_coef": f"${coefficients['square_feet']:.2f}",
+        "bedroom_coef": money(coefficients["bedrooms"]),
+        "min_leases": run["params"].get("min_leases", ""),
+        "alpha": run["params"].get("alpha", ""),
+        "premium_table": premium_table,
+        "residual_amount": money(abs(residual)),
+        "residual_direction": "above" if above else "below",
+        "subject_residual": money(residual, sign=True),
+        "subject_actual": money(row["avg_actual_rent"]),
+        "subject_predicted": money(row["avg_predicted_rent"]),
+        "subject_leases": f"{row['lease_count']:.0f}",
+        "subject_status": (
+            "Already performing above market expectations"
+            if above
+            else "Performing below market expectations"
+        ),
+        "comp_residual": money(comp_residual),
+        "comp_count": len(comps),
+        "uplift": money(uplift),
+        "annual_increase": money(annual_increase),
+        "max_budget": money(max_budget),
+        "renovation_budget": budget_text,
+        "actual_roi": f"{actual_roi:.1f}",
+        "budget_assessment": (
+            f"Sufficient for renovations (within {budget_text} budget)"
+            if sufficient
+            else f"Insufficient for renovations (below {budget_text} budget)"
+        ),
+        "roi_assessment": (
+            "Exceeds 7% minimum ROI threshold"
+            if actual_roi >= TARGET_RETURN * 100
+            else "Below 7% minimum ROI threshold"
+        ),
+        "premium_leases": f"{premium_leases:,.0f}",
+        "lease_ratio": f"{premium_leases / row['lease_count']:.1f}",
+        "subject_share": f"{subject_share:.1f}",
+        "upside_word": upside_word,
+        "findings": "\n".join(f"{i}. {line}" for i, line in enumerate(findings, 1)),
+        "recommendation": recommendation,
+        "rationale": "\n".join(f"- {line}" for line in rationale),
+        "final_summary": final_summary,
+        "run_id": run["run_id"],
+        "run_created": run["created_at"],
+        "export_hash": run["export_hash"][:12],
+    }
+
+
+def write_report(path, text):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(path + ".tmp", path)
+
+
+def publish(results, subjects, output_dir, renovation_budget, workers=None):
+    """Render every subject's reports; returns (written paths, charts rendered)."""
+    templates = {}
+    for kind, filename in TEMPLATES.items():
+        with open(os.path.join(TEMPLATE_DIR, filename), encoding="utf-8") as f:
+            templates[kind] = string.Template(f.read())
+    residuals = results["properties"]["avg_residual"]
+    stems = output_names(subjects)
+    os.makedirs(output_dir, exist_ok=True)
+
+    def render(subject):
+        context = subject_context(results, subject, renovation_budget)
+        if context is None:
+            print(f"Skipped {subject}: no premium comparables in the run")
+            return [], False
+        cached, rendered = chart_path(output_dir, residuals, subject, context["comps"])
+        context["chart"] = publish_chart(
+            output_dir, cached, f"{stems[subject]}_RESIDUALS.png"
+        )
+        paths = []
+        for kind, template in templates.items():
+            path = os.path.join(
+                output_dir, f"{stems[subject]}_RENOVATION_ANALYSIS_{kind}.md"
+            )
+            write_report(path, template.substitute(context))
+            paths.append(path)
+        return paths, rendered
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(render, subjects))
+    written = [path for paths, _ in outcomes for path in paths]
+    return written, sum(rendered for _, rendered in outcomes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--run-id", type=int)
+    parser.add_argument("--subjects", nargs="+", default=DEFAULT_SUBJECTS)
+    parser.add_argument(
+        "--all", action="store_true", help="one report pair per property in the run"
+    )
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--renovation-budget", type=float, default=RENOVATION_BUDGET)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with ResultsStore(args.db) as store:
+        results = load_results(store, args.run_id)
+    subjects = list(results["properties"].index) if args.all else args.subjects
+    missing = [name for name in subjects if name not in results["properties"].index]
+    if missing:
+        parser.error(f"not in run {results['run']['run_id']}: {', '.join(missing)}")
+
+    written, rendered = publish(
+        results, subjects, args.output_dir, args.renovation_budget, args.workers
+    )
+    print(
+        f"Wrote {len(written)} reports for {len(subjects)} subjects from run "
+        f"{results['run']['run_id']} in {time.perf_counter() - start:.2f}s "
+        f"({rendered} charts rendered, the rest from {CACHE_DIR}/)"
+    )
+
+
+if __name__ == "__main__":
+    main()
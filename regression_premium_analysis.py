@@ -1,46 +1,35 @@
-import pandas as pd
+import os
+
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score
 
-# Read and clean data
-df_csv = pd.read_csv("../DIS_market_export.csv", low_memory=False)
+from aggregate_cube import AggregateCube
+from backends import aggregate
+from data_quality import clean_leases
+from rent_data import EXPORT_PATH, LEASED, LEASED_NO_NOVEL, load_export
+from rent_model import RentModel, r2_score
+from residual_tests import ALPHA, PERMUTATIONS, property_residual_tests
+from result_sink import ResultSink
+from results_store import ResultsStore
 
-# Clean data
-df_csv["market_rent_clean"] = (
-    df_csv["market_rent"].str.replace("$", "").str.replace(",", "").str.strip()
-)
-df_csv["market_rent_numeric"] = pd.to_numeric(
-    df_csv["market_rent_clean"], errors="coerce"
-)
-df_csv["square_feet_clean"] = (
-    df_csv["square_feet"].astype(str).str.replace(",", "").str.strip()
-)
-df_csv["square_feet_numeric"] = pd.to_numeric(
-    df_csv["square_feet_clean"], errors="coerce"
-)
-df_csv["bedrooms_numeric"] = pd.to_numeric(df_csv["bedrooms"], errors="coerce")
+# Read and clean data
+df_csv = load_export()
 
-# Focus on leased units and clean data
-leased_df = df_csv[df_csv["leased"] == 1].copy()
-leased_df = leased_df.dropna(
-    subset=["market_rent_numeric", "bedrooms_numeric", "square_feet_numeric"]
-)
+# Focus on leased units and clean data, excluding NOVEL Daybreak as requested
+leased_count = LEASED.mask(df_csv).sum()
+leased_df_no_novel = LEASED_NO_NOVEL.apply(df_csv)
 
-# Exclude NOVEL Daybreak as requested
-leased_df_no_novel = leased_df[
-    leased_df["property_name"] != "NOVEL Daybreak by Crescent Communities"
-].copy()
+# Drop duplicate unit records and implausible rent/sqft before fitting
+leased_df_no_novel, quality_report = clean_leases(leased_df_no_novel)
 
 print("=" * 80)
 print("REGRESSION-BASED PREMIUM PROPERTY ANALYSIS")
 print("=" * 80)
 
 print(f"\nData Summary:")
-print(f"Total leased units: {len(leased_df)}")
-print(f"Leased units excluding NOVEL: {len(leased_df_no_novel)}")
-print(f"NOVEL leased units: {len(leased_df) - len(leased_df_no_novel)}")
+print(f"Total leased units: {leased_count}")
+print(f"Leased units excluding NOVEL: {quality_report.rows_in}")
+print(f"NOVEL leased units: {leased_count - quality_report.rows_in}")
+print(quality_report)
 
 # Prepare features for regression
 # Using square feet and bedrooms as predictors of rent
@@ -48,7 +37,7 @@ X = leased_df_no_novel[["square_feet_numeric", "bedrooms_numeric"]]
 y = leased_df_no_novel["market_rent_numeric"]
 
 # Fit linear regression
-model = LinearRegression()
+model = RentModel()
 model.fit(X, y)
 
 # Get predictions
@@ -72,14 +61,15 @@ leased_df_no_novel["residual_pct"] = (
 
 # Analyze by property
 property_analysis = (
-    leased_df_no_novel.groupby("property_name")
-    .agg(
+    aggregate(
+        leased_df_no_novel,
+        "property_name",
         {
             "residual": ["mean", "median", "std"],
             "residual_pct": ["mean", "median"],
             "market_rent_numeric": ["mean", "count"],
             "predicted_rent": "mean",
-        }
+        },
     )
     .round(2)
 )
@@ -96,6 +86,30 @@ property_analysis.columns = [
 ]
 property_analysis = property_analysis.reset_index()
 
+# Test each property's mean residual against zero, so noise around the line
+# isn't read as a premium or a discount (BH-adjusted across properties)
+residual_tests = property_residual_tests(leased_df_no_novel, permutations=PERMUTATIONS)
+property_analysis = property_analysis.merge(
+    residual_tests[
+        [
+            "property_name",
+            "t_stat",
+            "t_p",
+            "t_q",
+            "perm_p",
+            "perm_q",
+            "significant",
+        ]
+    ],
+    on="property_name",
+    how="left",
+)
+property_analysis["status"] = np.where(
+    ~property_analysis["significant"].fillna(False).astype(bool),
+    "WITHIN NOISE",
+    np.where(property_analysis["avg_residual"] > 0, "PREMIUM", "BELOW MARKET"),
+)
+
 # Sort by average residual (most premium first)
 property_analysis_sorted = property_analysis.sort_values(
     "avg_residual", ascending=False
@@ -105,31 +119,40 @@ print(f"\n" + "=" * 80)
 print("PROPERTIES RANKED BY PREMIUM TO REGRESSION LINE")
 print("=" * 80)
 print("(Positive residuals = above market line = premium properties)")
+print(
+    f"(q = Benjamini-Hochberg adjusted one-sample t p; "
+    f"WITHIN NOISE when q >= {ALPHA})"
+)
 print()
 
 for _, row in property_analysis_sorted.iterrows():
-    status = "PREMIUM" if row["avg_residual"] > 0 else "BELOW MARKET"
     print(
         f"{row['property_name'][:35]:<35} | "
         f"Residual: ${row['avg_residual']:>6.0f} | "
         f"Pct: {row['avg_residual_pct']:>5.1f}% | "
-        f"Leases: {row['lease_count']:>3.0f} | {status}"
+        f"Leases: {row['lease_count']:>3.0f} | "
+        f"q: {row['t_q']:>5.3f} | {row['status']}"
     )
 
 # Identify premium properties (significantly above regression line)
-# Using properties with positive residuals and sufficient volume
+# Using properties with positive residuals, sufficient volume and a mean
+# residual that is significantly different from zero
 premium_threshold = 0  # Above regression line
 min_leases = 20  # Minimum lease volume for reliability
 
 premium_properties = property_analysis_sorted[
     (property_analysis_sorted["avg_residual"] > premium_threshold)
     & (property_analysis_sorted["lease_count"] >= min_leases)
+    & (property_analysis_sorted["status"] == "PREMIUM")
 ]
 
 print(f"\n" + "=" * 60)
 print("IDENTIFIED PREMIUM PROPERTIES (Above Regression Line)")
 print("=" * 60)
-print(f"Criteria: Residual > ${premium_threshold}, Min {min_leases} leases")
+print(
+    f"Criteria: Residual > ${premium_threshold}, Min {min_leases} leases, "
+    f"t-test q < {ALPHA}"
+)
 print()
 
 total_premium_leases = 0
@@ -143,6 +166,10 @@ for _, row in premium_properties.iterrows():
         f"  Actual Rent: ${row['avg_actual_rent']:,.0f} vs Predicted: ${row['avg_predicted_rent']:,.0f}"
     )
     print(f"  Lease Volume: {row['lease_count']:.0f}")
+    print(
+        f"  Significance: t-test q = {row['t_q']:.4f}, "
+        f"sign-flip q = {row['perm_q']:.4f}"
+    )
     print()
 
 # Analyze District's position
@@ -159,12 +186,61 @@ if not district_analysis.empty:
     print(f"Actual Rent: ${district_row['avg_actual_rent']:,.0f}")
     print(f"Predicted Rent: ${district_row['avg_predicted_rent']:,.0f}")
     print(f"Lease Volume: {district_row['lease_count']:.0f}")
+    print(
+        f"Significance: t = {district_row['t_stat']:.2f}, "
+        f"q = {district_row['t_q']:.4f}; "
+        f"sign-flip q = {district_row['perm_q']:.4f}"
+    )
 
-    if district_row["avg_residual"] < 0:
+    if district_row["status"] == "WITHIN NOISE":
+        print("Note: District's gap to the line is within noise at this volume")
+        print("Status: WITHIN NOISE - Renovation opportunity not established")
+    elif district_row["status"] == "BELOW MARKET":
         print("Status: BELOW MARKET - Renovation opportunity confirmed")
     else:
         print("Status: AT/ABOVE MARKET - Limited renovation upside")
 
+print(f"\n" + "=" * 60)
+print("INFLUENCE DIAGNOSTICS (closed form, no refits)")
+print("=" * 60)
+
+# Leverage and Cook's distance for every lease in the fitted model
+lease_influence = model.influence()
+n_obs = len(lease_influence)
+n_params = 1 + len(model.coef_)
+print(
+    f"High-leverage leases (h > 2p/n): "
+    f"{(lease_influence['leverage'] > 2 * n_params / n_obs).sum()}"
+)
+print(
+    f"Influential leases (Cook's D > 4/n): "
+    f"{(lease_influence['cooks_distance'] > 4 / n_obs).sum()}"
+)
+
+# Effect of dropping each whole property from a fit over all leased units,
+# NOVEL included, to show which exclusions actually move the line
+all_leased, _ = clean_leases(LEASED.apply(df_csv))
+full_model = RentModel().fit(
+    all_leased[["square_feet_numeric", "bedrooms_numeric"]],
+    all_leased["market_rent_numeric"],
+)
+property_influence = (
+    full_model.group_influence(all_leased["property_name"])
+    .rename(columns={"group": "property_name"})
+    .sort_values("cooks_distance", ascending=False)
+)
+
+print("\nMost influential properties (all leased units, including NOVEL):")
+for _, row in property_influence.head(5).iterrows():
+    print(
+        f"{row['property_name'][:35]:<35} | "
+        f"Cook's D: {row['cooks_distance']:>6.3f} | "
+        f"Intercept: {row['delta_intercept']:>+6.1f} | "
+        f"Sq ft: {row['delta_square_feet']:>+6.3f} | "
+        f"Bedroom: {row['delta_bedrooms']:>+6.1f} | "
+        f"Leases: {row['count']:>3.0f}"
+    )
+
 print(f"\n" + "=" * 60)
 print("RENOVATION POTENTIAL ANALYSIS")
 print("=" * 60)
@@ -184,6 +260,67 @@ if not premium_properties.empty and not district_analysis.empty:
         f"Market Capacity Ratio: {total_premium_leases / district_row['lease_count']:.1f}x"
     )
 
+# Persist the run so later exports can be compared by lookup
+roi = {}
+if not premium_properties.empty and not district_analysis.empty:
+    roi = {
+        "avg_premium_residual": avg_premium_residual,
+        "district_residual": district_residual,
+        "potential_uplift": potential_uplift,
+    }
+
+with ResultsStore() as store:
+    run_id = store.record_run(
+        __file__,
+        EXPORT_PATH,
+        params={
+            "filter": LEASED_NO_NOVEL.to_dict(),
+            "premium_threshold": premium_threshold,
+            "min_leases": min_leases,
+            "alpha": ALPHA,
+            "permutations": PERMUTATIONS,
+        },
+        coefficients={
+            "intercept": model.intercept_,
+            "square_feet": model.coef_[0],
+            "bedrooms": model.coef_[1],
+            "r2": r2,
+        },
+        property_table=property_analysis,
+        premium_set=premium_properties["property_name"],
+        roi=roi,
+    )
+print(f"\nResults stored as run {run_id} in {store.path}")
+
+# Structured copies of the report tables for downstream consumers
+sink = ResultSink(__file__)
+sink.write_table("property_residuals", property_analysis_sorted)
+sink.write_table("premium_properties", premium_properties)
+sink.write_table("property_influence", property_influence)
+# Residual cube, so any property/bedroom/sqft-band slice can be re-ranked later
+AggregateCube.build(leased_df_no_novel, residual_column="residual").save(
+    os.path.join(sink.directory, "aggregate_cube.arrow")
+)
+sink.write_summary(
+    {
+        "run_id": run_id,
+        "r2": r2,
+        "intercept": model.intercept_,
+        "coef_square_feet": model.coef_[0],
+        "coef_bedrooms": model.coef_[1],
+        "total_leased_units": leased_count,
+        "leased_units_excluding_novel": quality_report.rows_in,
+        "duplicates_removed": quality_report.duplicates_removed,
+        "outliers_removed": quality_report.outliers_removed,
+        "units_fitted": len(leased_df_no_novel),
+        "premium_properties": premium_properties["property_name"],
+        "district": (
+            district_analysis.iloc[0].to_dict() if not district_analysis.empty else None
+        ),
+        "renovation_potential": roi,
+    }
+)
+
 # Create visualization data for plotting
 print(f"\n" + "=" * 60)
 print("REGRESSION VISUALIZATION READY")
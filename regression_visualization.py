@@ -1,43 +1,23 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score
 
-# Read and clean data (same as before)
-df_csv = pd.read_csv("../DIS_market_export.csv", low_memory=False)
+from backends import aggregate
+from data_quality import clean_leases
+from property_names import display_name
+from rent_data import LEASED_NO_NOVEL, load_working_set
+from rent_model import RentModel, r2_score
 
-# Clean data
-df_csv["market_rent_clean"] = (
-    df_csv["market_rent"].str.replace("$", "").str.replace(",", "").str.strip()
-)
-df_csv["market_rent_numeric"] = pd.to_numeric(
-    df_csv["market_rent_clean"], errors="coerce"
-)
-df_csv["square_feet_clean"] = (
-    df_csv["square_feet"].astype(str).str.replace(",", "").str.strip()
-)
-df_csv["square_feet_numeric"] = pd.to_numeric(
-    df_csv["square_feet_clean"], errors="coerce"
-)
-df_csv["bedrooms_numeric"] = pd.to_numeric(df_csv["bedrooms"], errors="coerce")
-
-# Focus on leased units and clean data
-leased_df = df_csv[df_csv["leased"] == 1].copy()
-leased_df = leased_df.dropna(
-    subset=["market_rent_numeric", "bedrooms_numeric", "square_feet_numeric"]
-)
+# Read and clean data, keeping leased units and excluding NOVEL Daybreak as requested
+leased_df_no_novel = load_working_set(LEASED_NO_NOVEL)
 
-# Exclude NOVEL Daybreak as requested
-leased_df_no_novel = leased_df[
-    leased_df["property_name"] != "NOVEL Daybreak by Crescent Communities"
-].copy()
+# Drop duplicate unit records and implausible rent/sqft before fitting
+leased_df_no_novel, quality_report = clean_leases(leased_df_no_novel)
 
 # Fit regression model
 X = leased_df_no_novel[["square_feet_numeric", "bedrooms_numeric"]]
 y = leased_df_no_novel["market_rent_numeric"]
 
-model = LinearRegression()
+model = RentModel()
 model.fit(X, y)
 y_pred = model.predict(X)
 r2 = r2_score(y, y_pred)
@@ -50,15 +30,16 @@ leased_df_no_novel["residual"] = (
 
 # Get property averages for plotting
 property_avg = (
-    leased_df_no_novel.groupby("property_name")
-    .agg(
+    aggregate(
+        leased_df_no_novel,
+        "property_name",
         {
             "market_rent_numeric": "mean",
             "predicted_rent": "mean",
             "residual": "mean",
             "square_feet_numeric": "mean",
             "bedrooms_numeric": "mean",
-        }
+        },
     )
     .reset_index()
 )
@@ -95,9 +76,7 @@ ax1.legend()
 # Add property labels for ALL properties
 for _, row in property_avg.iterrows():
     # Shorten property names for readability
-    short_name = row["property_name"].replace(' Apartments', '').replace('ICO ', '').replace(' at Daybreak', '').replace(' by Crescent Communities', '')
-    if len(short_name) > 15:
-        short_name = short_name[:15] + '...'
+    short_name = display_name(row["property_name"])
     
     ax1.annotate(short_name, 
                 (row["predicted_rent"], row["market_rent_numeric"]),
@@ -129,9 +108,7 @@ ax2.legend()
 
 # Add property labels to residuals chart
 for _, row in property_avg.iterrows():
-    short_name = row["property_name"].replace(' Apartments', '').replace('ICO ', '').replace(' at Daybreak', '').replace(' by Crescent Communities', '')
-    if len(short_name) > 15:
-        short_name = short_name[:15] + '...'
+    short_name = display_name(row["property_name"])
     
     ax2.annotate(short_name, 
                 (row["predicted_rent"], row["residual"]),
@@ -194,9 +171,7 @@ ax4.legend()
 
 # Add property labels to square footage chart
 for _, row in property_avg.iterrows():
-    short_name = row["property_name"].replace(' Apartments', '').replace('ICO ', '').replace(' at Daybreak', '').replace(' by Crescent Communities', '')
-    if len(short_name) > 15:
-        short_name = short_name[:15] + '...'
+    short_name = display_name(row["property_name"])
     
     ax4.annotate(short_name, 
                 (row["square_feet_numeric"], row["market_rent_numeric"]),
@@ -213,6 +188,7 @@ print("Chart saved as 'rental_regression_analysis_labeled.png'")
 print("="*80)
 print("REGRESSION ANALYSIS SUMMARY")
 print("="*80)
+print(quality_report)
 print(f"Model R²: {r2:.3f}")
 print(f"Intercept: ${model.intercept_:.2f}")
 print(f"Square Feet Coefficient: ${model.coef_[0]:.2f} per sq ft")
@@ -1,42 +1,28 @@
-import pandas as pd
-import numpy as np
+import os
 
-# Read the CSV data
-df_csv = pd.read_csv("../DIS_market_export.csv", low_memory=False)
+import numpy as np
 
-# Clean data
-df_csv["market_rent_clean"] = (
-    df_csv["market_rent"].str.replace("$", "").str.replace(",", "").str.strip()
-)
-df_csv["market_rent_numeric"] = pd.to_numeric(
-    df_csv["market_rent_clean"], errors="coerce"
-)
-df_csv["square_feet_clean"] = (
-    df_csv["square_feet"].astype(str).str.replace(",", "").str.strip()
-)
-df_csv["square_feet_numeric"] = pd.to_numeric(
-    df_csv["square_feet_clean"], errors="coerce"
-)
-df_csv["bedrooms_numeric"] = pd.to_numeric(df_csv["bedrooms"], errors="coerce")
+from aggregate_cube import AggregateCube, mix_weighted_uplift
+from rent_data import EXPORT_PATH, LEASED, load_working_set
+from result_sink import ResultSink
+from results_store import ResultsStore
 
-# Focus on leased units
-leased_df = df_csv[df_csv["leased"] == 1].copy()
-leased_df = leased_df.dropna(
-    subset=["market_rent_numeric", "bedrooms_numeric", "square_feet_numeric"]
-)
+# Read the CSV data, keeping leased units only
+leased_df = load_working_set(LEASED)
 
 print("=" * 80)
 print("DISTRICT RENOVATION ANALYSIS - FINAL RECOMMENDATION")
 print("=" * 80)
 
+# Aggregate once by property, bedrooms and sqft band; the slices below read the cube
+cube = AggregateCube.build(leased_df)
+
 # Calculate current District rents
-district_data = leased_df[leased_df["property_name"] == "ICO District"]
-district_1br = district_data[district_data["bedrooms_numeric"] == 1][
-    "market_rent_numeric"
-].mean()
-district_2br = district_data[district_data["bedrooms_numeric"] == 2][
-    "market_rent_numeric"
-].mean()
+district_rents = (
+    cube.slice(["ICO District"]).rollup(["bedrooms"]).set_index("bedrooms")
+)
+district_1br = district_rents["avg_rent"].get(1, np.nan)
+district_2br = district_rents["avg_rent"].get(2, np.nan)
 
 print(f"\nCURRENT DISTRICT RENTS (Leased Units):")
 print(f"1BR Average: ${district_1br:,.0f}")
@@ -55,13 +41,11 @@ print(f"\nPREMIUM COMPARABLE ANALYSIS:")
 print(f"Selected Premium Comps: {', '.join(premium_comps)}")
 
 # Calculate average premium comp rents
-premium_data = leased_df[leased_df["property_name"].isin(premium_comps)]
-premium_1br = premium_data[premium_data["bedrooms_numeric"] == 1][
-    "market_rent_numeric"
-].mean()
-premium_2br = premium_data[premium_data["bedrooms_numeric"] == 2][
-    "market_rent_numeric"
-].mean()
+premium_rents = (
+    cube.slice(premium_comps).rollup(["bedrooms"]).set_index("bedrooms")
+)
+premium_1br = premium_rents["avg_rent"].get(1, np.nan)
+premium_2br = premium_rents["avg_rent"].get(2, np.nan)
 
 print(f"\nPREMIUM COMP AVERAGE RENTS:")
 print(f"1BR Average: ${premium_1br:,.0f}")
@@ -80,8 +64,8 @@ print(
 )
 
 # Calculate unit mix for District
-district_1br_count = len(district_data[district_data["bedrooms_numeric"] == 1])
-district_2br_count = len(district_data[district_data["bedrooms_numeric"] == 2])
+district_1br_count = int(district_rents["count"].get(1, 0))
+district_2br_count = int(district_rents["count"].get(2, 0))
 total_district_units = district_1br_count + district_2br_count
 
 print(f"\nDISTRICT UNIT MIX (from leased data):")
@@ -94,9 +78,7 @@ print(
 print(f"Total Units: {total_district_units}")
 
 # Calculate weighted average rent uplift
-weighted_uplift = (
-    uplift_1br * district_1br_count + uplift_2br * district_2br_count
-) / total_district_units
+weighted_uplift, _ = mix_weighted_uplift(cube, "ICO District", premium_comps)
 
 print(f"\nWEIGHTED AVERAGE RENT UPLIFT: ${weighted_uplift:.0f}")
 
@@ -120,8 +102,8 @@ print(f"\n" + "=" * 60)
 print("LEASING VELOCITY & MARKET SHARE ANALYSIS")
 print("=" * 60)
 
-district_leases = len(district_data)
-premium_leases = len(premium_data)
+district_leases = int(district_rents["count"].sum())
+premium_leases = int(premium_rents["count"].sum())
 total_market_leases = district_leases + premium_leases
 
 print(f"\nLEASING VOLUME ANALYSIS:")
@@ -172,3 +154,43 @@ print(f"• Premium Market Size: {market_multiplier:.1f}x District's current vol
 print(
     f"• District's Current Market Share: {district_leases / total_market_leases * 100:.1f}%"
 )
+
+# Persist the run so later exports can be compared by lookup
+with ResultsStore() as store:
+    run_id = store.record_run(
+        __file__,
+        EXPORT_PATH,
+        params={"filter": LEASED.to_dict(), "premium_comps": sorted(premium_comps)},
+        premium_set=premium_comps,
+        roi={
+            "district_1br_rent": district_1br,
+            "district_2br_rent": district_2br,
+            "premium_1br_rent": premium_1br,
+            "premium_2br_rent": premium_2br,
+            "weighted_uplift": weighted_uplift,
+            "max_budget_per_unit": max_budget_per_unit,
+        },
+    )
+print(f"\nResults stored as run {run_id} in {store.path}")
+
+# Structured copy of the ROI summary for downstream consumers, plus the cube
+# so other unit mixes and slices can be answered without the row-level data
+sink = ResultSink(__file__)
+cube.save(os.path.join(sink.directory, "aggregate_cube.arrow"))
+sink.write_summary(
+    {
+        "run_id": run_id,
+        "premium_comps": premium_comps,
+        "district_1br_rent": district_1br,
+        "district_2br_rent": district_2br,
+        "premium_1br_rent": premium_1br,
+        "premium_2br_rent": premium_2br,
+        "district_1br_count": district_1br_count,
+        "district_2br_count": district_2br_count,
+        "weighted_uplift": weighted_uplift,
+        "max_budget_per_unit": max_budget_per_unit,
+        "district_leases": district_leases,
+        "premium_leases": premium_leases,
+        "recommendation": recommendation,
+    }
+)
@@ -0,0 +1,121 @@
+"""Loading, cleaning and filtering of the market export.
+
+Every analysis script starts from the same export and narrows it down to
+its working set. The narrowing is described by a :class:`FilterSpec`, which
+compiles to a single boolean mask so the export is copied once, and which
+serializes to a stable key for caching results per working set.
+"""
+
+import hashlib
+import json
+from dataclasses import asdict, dataclass, replace
+
+import numpy as np
+
+from backends import get_backend
+from property_names import NAME_MAP_PATH, load_mapping
+
+EXPORT_PATH = "../DIS_market_export.csv"
+
+REQUIRED_COLUMNS = ("market_rent_numeric", "bedrooms_numeric", "square_feet_numeric")
+
+
+def load_export(path=EXPORT_PATH, name_map_path=NAME_MAP_PATH, backend=None):
+    """Read the export and add the numeric rent, square feet and bedroom columns.
+
+    Property names are rewritten to their canonical form when a name mapping
+    (see property_names.py) exists. ``backend`` picks the engine (see
+    backends.py); the result is a pandas frame either way.
+    """
+    return get_backend(backend).load(path, load_mapping(name_map_path))
+
+
+def load_working_set(
+    spec, path=EXPORT_PATH, name_map_path=NAME_MAP_PATH, backend=None
+):
+    """Load only the rows of ``spec``'s working set.
+
+    Lazy backends push the filter into the CSV scan instead of cleaning
+    every row first.
+    """
+    return get_backend(backend).working_set(path, spec, load_mapping(name_map_path))
+
+
+@dataclass(frozen=True)
+class FilterSpec:
+    """Declarative description of an analysis working set.
+
+    ``None`` means "don't filter on this"; ``sqft_min`` is inclusive and
+    ``sqft_max`` exclusive so adjacent bands don't overlap.
+    """
+
+    leased_only: bool = True
+    require: tuple = REQUIRED_COLUMNS
+    properties: tuple = None
+    exclude_properties: tuple = ()
+    bedrooms: tuple = None
+    sqft_min: float = None
+    sqft_max: float = None
+
+    def __post_init__(self):
+        # Normalize lists to sorted tuples so equal specs hash and serialize alike
+        for name in ("require", "properties", "exclude_properties", "bedrooms"):
+            value = getattr(self, name)
+            if value is not None:
+                object.__setattr__(self, name, tuple(sorted(value)))
+
+    def mask(self, df):
+        """Compile the spec into one boolean mask over ``df``."""
+        mask = np.ones(len(df), dtype=bool)
+        if self.leased_only:
+            mask &= df["leased"].to_numpy() == 1
+        for column in self.require:
+            mask &= df[column].notna().to_numpy()
+        if self.properties is not None:
+            mask &= df["property_name"].isin(self.properties).to_numpy()
+        if self.exclude_properties:
+            mask &= ~df["property_name"].isin(self.exclude_properties).to_numpy()
+        if self.bedrooms is not None:
+            mask &= df["bedrooms_numeric"].isin(self.bedrooms).to_numpy()
+        if self.sqft_min is not None:
+            mask &= (df["square_feet_numeric"] >= self.sqft_min).to_numpy()
+        if self.sqft_max is not None:
+            mask &= (df["square_feet_numeric"] < self.sqft_max).to_numpy()
+        return mask
+
+    def apply(self, df):
+        """Return the working set as a single new frame."""
+        return df[self.mask(df)].copy()
+
+    def narrow(self, **changes):
+        """Return a copy of the spec with some fields changed."""
+        return replace(self, **changes)
+
+    def to_dict(self):
+        return {
+            name: list(value) if isinstance(value, tuple) else value
+            for name, value in asdict(self).items()
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), sort_keys=True)
+
+    @classmethod
+    def from_json(cls, text):
+        fields = json.loads(text)
+        return cls(
+            **{
+                name: tuple(value) if isinstance(value, list) else value
+                for name, value in fields.items()
+            }
+        )
+
+    def cache_key(self):
+        return hashlib.sha1(self.to_json().encode()).hexdigest()
+
+
+# Working sets shared by the scripts
+LEASED = FilterSpec()
+LEASED_NO_NOVEL = FilterSpec(
+    exclude_properties=("NOVEL Daybreak by Crescent Communities",)
+)
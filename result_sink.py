@@ -0,0 +1,92 @@
+"""Machine-readable copies of the report tables.
+
+Each script writes its tables as Arrow IPC files (optionally Parquet as
+well) and its headline numbers as a JSON summary, next to the printed
+report. Arrow IPC files are written uncompressed so consumers can
+memory-map them without copying:
+
+    import pyarrow as pa
+    table = pa.ipc.open_file(pa.memory_map("results/<script>/<table>.arrow")).read_all()
+
+Files are written to a temporary name and renamed into place, so a reader
+never sees a half-written table.
+"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+DEFAULT_OUTPUT_DIR = os.environ.get("RENOVATION_OUTPUT_DIR", "results")
+
+
+def _jsonable(value):
+    """Plain Python copy of ``value`` with NaN and +-inf mapped to null,
+    since the summary is written with ``allow_nan=False``.
+
+    >>> _jsonable({"t": np.float64("inf"), "q": [np.nan, -np.inf, 0.5]})
+    {'t': None, 'q': [None, None, 0.5]}
+    """
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if hasattr(value, "tolist"):
+        return _jsonable(value.tolist())
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+class ResultSink:
+    """Writes one script's tables and summary under ``out_dir/<script>/``."""
+
+    def __init__(self, script, out_dir=DEFAULT_OUTPUT_DIR, parquet=False):
+        self.script = os.path.splitext(os.path.basename(script))[0]
+        self.directory = os.path.join(out_dir, self.script)
+        self.parquet = parquet
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, name, extension):
+        return os.path.join(self.directory, f"{name}.{extension}")
+
+    def write_table(self, name, df):
+        """Write ``df`` column by column to Arrow IPC (and Parquet if enabled)."""
+        # Deferred so the text reports don't pay for pyarrow at startup
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        path = self._path(name, "arrow")
+        with pa.OSFile(path + ".tmp", "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(path + ".tmp", path)
+
+        if self.parquet:
+            import pyarrow.parquet as pq
+
+            parquet_path = self._path(name, "parquet")
+            pq.write_table(table, parquet_path + ".tmp")
+            os.replace(parquet_path + ".tmp", parquet_path)
+        return path
+
+    def write_summary(self, summary, name="summary"):
+        """Write the headline numbers as JSON, tagged with script and time."""
+        document = {
+            "script": self.script,
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            **summary,
+        }
+        path = self._path(name, "json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(_jsonable(document), f, indent=2, allow_nan=False)
+        os.replace(path + ".tmp", path)
+        return path
+
+
+def read_table(path):
+    """Memory-map an Arrow IPC table written by :class:`ResultSink`."""
+    import pyarrow as pa
+
+    return pa.ipc.open_file(pa.memory_map(path)).read_all()
@@ -0,0 +1,316 @@
+"""SQLite store for analysis results, so old runs can be compared by lookup.
+
+Each run is keyed by the script that produced it, a hash of the export it
+read and the parameters it used. Model coefficients, per-property
+aggregates, the premium set and the ROI figures are stored in long tables
+indexed by run and by property, which keeps trend queries to index scans.
+
+Usage:
+    python results_store.py runs
+    python results_store.py trend "ICO District" --metric avg_residual
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+DEFAULT_DB_PATH = os.environ.get("RENOVATION_RESULTS_DB", "renovation_results.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    script TEXT NOT NULL,
+    export_path TEXT NOT NULL,
+    export_hash TEXT NOT NULL,
+    params TEXT NOT NULL,
+    params_key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_export ON runs (export_hash, params_key, script);
+CREATE INDEX IF NOT EXISTS runs_by_script ON runs (script, created_at);
+
+CREATE TABLE IF NOT EXISTS coefficients (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    term TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, term)
+);
+
+CREATE TABLE IF NOT EXISTS property_metrics (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    property_name TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, property_name, metric)
+);
+CREATE INDEX IF NOT EXISTS property_metrics_by_property
+    ON property_metrics (property_name, metric, run_id);
+
+CREATE TABLE IF NOT EXISTS premium_set (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    property_name TEXT NOT NULL,
+    PRIMARY KEY (run_id, property_name)
+);
+
+CREATE TABLE IF NOT EXISTS roi (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    metric TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, metric)
+);
+
+CREATE TABLE IF NOT EXISTS export_hashes (
+    export_path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    export_hash TEXT NOT NULL,
+    PRIMARY KEY (export_path, size, mtime_ns)
+);
+"""
+
+
+def params_key(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultsStore:
+    """Run history for the renovation analyses."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def export_hash(self, export_path):
+        """Content hash of an export, cached on path, size and mtime."""
+        export_path = os.path.abspath(export_path)
+        stat = os.stat(export_path)
+        row = self.conn.execute(
+            "SELECT export_hash FROM export_hashes"
+            " WHERE export_path = ? AND size = ? AND mtime_ns = ?",
+            (export_path, stat.st_size, stat.st_mtime_ns),
+        ).fetchone()
+        if row:
+            return row[0]
+        digest = hash_file(export_path)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO export_hashes VALUES (?, ?, ?, ?)",
+                (export_path, stat.st_size, stat.st_mtime_ns, digest),
+            )
+        return digest
+
+    def record_run(
+        self,
+        script,
+        export_path,
+        params,
+        coefficients=None,
+        property_table=None,
+        premium_set=None,
+        roi=None,
+    ):
+        """Persist one run's outputs in a single transaction and return its id.
+
+        ``property_table`` is a frame with a ``property_name`` column; every
+        numeric column becomes a metric for that property.
+        """
+        export_hash = self.export_hash(export_path)
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (created_at, script, export_path, export_hash,"
+                " params, params_key) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    datetime.now().isoformat(timespec="seconds"),
+                    os.path.basename(script),
+                    os.path.abspath(export_path),
+                    export_hash,
+                    json.dumps(params, sort_keys=True),
+                    params_key(params),
+                ),
+            )
+            run_id = cursor.lastrowid
+            if coefficients:
+                self.conn.executemany(
+                    "INSERT INTO coefficients VALUES (?, ?, ?)",
+                    [(run_id, term, float(v)) for term, v in coefficients.items()],
+                )
+            if property_table is not None and not property_table.empty:
+                metrics = property_table.set_index("property_name").select_dtypes(
+                    "number"
+                )
+                long = metrics.stack().reset_index()
+                self.conn.executemany(
+                    "INSERT INTO property_metrics VALUES (?, ?, ?, ?)",
+                    [
+                        (run_id, name, metric, float(value))
+                        for name, metric, value in long.itertuples(index=False)
+                    ],
+                )
+            if premium_set is not None:
+                self.conn.executemany(
+                    "INSERT INTO premium_set VALUES (?, ?)",
+                    [(run_id, name) for name in premium_set],
+                )
+            if roi:
+                self.conn.executemany(
+                    "INSERT INTO roi VALUES (?, ?, ?)",
+                    [(run_id, metric, float(v)) for metric, v in roi.items()],
+                )
+        return run_id
+
+    def find_run(self, export_path, params, script=None):
+        """Latest run over the same export and parameters, or None."""
+        query = "SELECT MAX(run_id) FROM runs WHERE export_hash = ? AND params_key = ?"
+        args = [self.export_hash(export_path), params_key(params)]
+        if script is not None:
+            query += " AND script = ?"
+            args.append(os.path.basename(script))
+        return self.conn.execute(query, args).fetchone()[0]
+
+    def latest_run(self, script=None):
+        query = "SELECT MAX(run_id) FROM runs"
+        args = []
+        if script is not None:
+            query += " WHERE script = ?"
+            args.append(os.path.basename(script))
+        return self.conn.execute(query, args).fetchone()[0]
+
+    def runs(self, script=None):
+        query = "SELECT run_id, created_at, script, export_hash, params FROM runs"
+        args = []
+        if script is not None:
+            query += " WHERE script = ?"
+            args.append(os.path.basename(script))
+        return pd.read_sql_query(query + " ORDER BY run_id", self.conn, params=args)
+
+    def run(self, run_id):
+        """One run's metadata and parameters as a dict, or None."""
+        row = self.conn.execute(
+            "SELECT run_id, created_at, script, export_path, export_hash, params"
+            " FROM runs WHERE run_id = ?",
+            (run_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ["run_id", "created_at", "script", "export_path", "export_hash"]
+        return dict(zip(keys, row[:5]), params=json.loads(row[5]))
+
+    def coefficients(self, run_id):
+        rows = self.conn.execute(
+            "SELECT term, value FROM coefficients WHERE run_id = ?", (run_id,)
+        )
+        return dict(rows.fetchall())
+
+    def property_table(self, run_id):
+        """Per-property metrics of one run, one row per property."""
+        long = pd.read_sql_query(
+            "SELECT property_name, metric, value FROM property_metrics"
+            " WHERE run_id = ?",
+            self.conn,
+            params=(run_id,),
+        )
+        wide = long.pivot(index="property_name", columns="metric", values="value")
+        wide.columns.name = None
+        return wide.reset_index()
+
+    def premium_set(self, run_id):
+        rows = self.conn.execute(
+            "SELECT property_name FROM premium_set WHERE run_id = ?"
+            " ORDER BY property_name",
+            (run_id,),
+        )
+        return [name for (name,) in rows.fetchall()]
+
+    def roi(self, run_id):
+        rows = self.conn.execute(
+            "SELECT metric, value FROM roi WHERE run_id = ?", (run_id,)
+        )
+        return dict(rows.fetchall())
+
+    def property_trend(self, property_name, metric="avg_residual", script=None):
+        """One metric for one property across every stored run, oldest first."""
+        query = (
+            "SELECT r.run_id, r.created_at, r.script, r.export_hash, m.value"
+            " FROM property_metrics m JOIN runs r ON r.run_id = m.run_id"
+            " WHERE m.property_name = ? AND m.metric = ?"
+        )
+        args = [property_name, metric]
+        if script is not None:
+            query += " AND r.script = ?"
+            args.append(os.path.basename(script))
+        return pd.read_sql_query(query + " ORDER BY r.run_id", self.conn, params=args)
+
+    def compare_runs(self, old_run_id, new_run_id, metric="avg_residual"):
+        """Side-by-side values of one metric for two runs, with the change.
+
+        Raises ValueError when either run has no such property metric.
+        """
+        tables = {}
+        for run_id in (old_run_id, new_run_id):
+            table = self.property_table(run_id)
+            if metric not in table:
+                raise ValueError(f"Run {run_id} has no property metric {metric!r}")
+            tables[run_id] = table.set_index("property_name")[metric]
+        old, new = tables[old_run_id], tables[new_run_id]
+        comparison = pd.DataFrame({"old": old, "new": new})
+        comparison["change"] = comparison["new"] - comparison["old"]
+        return comparison.reset_index()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    runs = commands.add_parser("runs", help="list stored runs")
+    runs.add_argument("--script")
+    trend = commands.add_parser("trend", help="one property's metric across runs")
+    trend.add_argument("property_name")
+    trend.add_argument("--metric", default="avg_residual")
+    trend.add_argument("--script")
+    compare = commands.add_parser("compare", help="compare a metric between runs")
+    compare.add_argument("old_run_id", type=int)
+    compare.add_argument("new_run_id", type=int)
+    compare.add_argument("--metric", default="avg_residual")
+    args = parser.parse_args()
+
+    with ResultsStore(args.db) as store:
+        if args.command == "runs":
+            print(store.runs(args.script).to_string(index=False))
+        elif args.command == "trend":
+            trend = store.property_trend(args.property_name, args.metric, args.script)
+            print(trend.to_string(index=False))
+        else:
+            try:
+                comparison = store.compare_runs(
+                    args.old_run_id, args.new_run_id, args.metric
+                )
+            except ValueError as error:
+                parser.error(str(error))
+            print(comparison.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
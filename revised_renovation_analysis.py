@@ -1,47 +1,27 @@
-import pandas as pd
-import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score
+from backends import aggregate
+from data_quality import clean_leases
+from rent_data import EXPORT_PATH, LEASED_NO_NOVEL, load_working_set
+from rent_model import RentModel, r2_score
+from result_sink import ResultSink
+from results_store import ResultsStore
 
-# Read and clean data
-df_csv = pd.read_csv("../DIS_market_export.csv", low_memory=False)
+# Read and clean data, keeping leased units and excluding NOVEL Daybreak as requested
+leased_df_no_novel = load_working_set(LEASED_NO_NOVEL)
 
-# Clean data
-df_csv["market_rent_clean"] = (
-    df_csv["market_rent"].str.replace("$", "").str.replace(",", "").str.strip()
-)
-df_csv["market_rent_numeric"] = pd.to_numeric(
-    df_csv["market_rent_clean"], errors="coerce"
-)
-df_csv["square_feet_clean"] = (
-    df_csv["square_feet"].astype(str).str.replace(",", "").str.strip()
-)
-df_csv["square_feet_numeric"] = pd.to_numeric(
-    df_csv["square_feet_clean"], errors="coerce"
-)
-df_csv["bedrooms_numeric"] = pd.to_numeric(df_csv["bedrooms"], errors="coerce")
-
-# Focus on leased units and clean data
-leased_df = df_csv[df_csv["leased"] == 1].copy()
-leased_df = leased_df.dropna(
-    subset=["market_rent_numeric", "bedrooms_numeric", "square_feet_numeric"]
-)
-
-# Exclude NOVEL Daybreak as requested
-leased_df_no_novel = leased_df[
-    leased_df["property_name"] != "NOVEL Daybreak by Crescent Communities"
-].copy()
+# Drop duplicate unit records and implausible rent/sqft before fitting
+leased_df_no_novel, quality_report = clean_leases(leased_df_no_novel)
 
 print("=" * 80)
 print("REVISED DISTRICT RENOVATION ANALYSIS")
 print("REGRESSION-BASED PREMIUM PROPERTY IDENTIFICATION")
 print("=" * 80)
+print(quality_report)
 
 # Fit regression model
 X = leased_df_no_novel[["square_feet_numeric", "bedrooms_numeric"]]
 y = leased_df_no_novel["market_rent_numeric"]
 
-model = LinearRegression()
+model = RentModel()
 model.fit(X, y)
 y_pred = model.predict(X)
 r2 = r2_score(y, y_pred)
@@ -54,14 +34,15 @@ leased_df_no_novel["residual"] = (
 
 # Get property averages
 property_analysis = (
-    leased_df_no_novel.groupby("property_name")
-    .agg(
+    aggregate(
+        leased_df_no_novel,
+        "property_name",
         {
             "residual": ["mean", "std"],
             "market_rent_numeric": ["mean", "count"],
             "predicted_rent": "mean",
             "bedrooms_numeric": "mean",
-        }
+        },
     )
     .round(2)
 )
@@ -234,3 +215,51 @@ if not district_analysis.empty and not premium_properties_df.empty:
     print(
         f"• Statistical reliability: Based on {district_row['lease_count']:.0f} District leases"
     )
+
+# Persist the run so later exports can be compared by lookup
+roi = {}
+if not district_analysis.empty and not premium_properties_df.empty:
+    roi = {
+        "avg_premium_residual": avg_premium_residual,
+        "district_residual": district_residual,
+        "monthly_uplift": realistic_uplift,
+        "annual_increase": annual_increase,
+        "max_renovation_budget": max_renovation_budget,
+    }
+
+with ResultsStore() as store:
+    run_id = store.record_run(
+        __file__,
+        EXPORT_PATH,
+        params={"filter": LEASED_NO_NOVEL.to_dict(), "min_leases": min_leases},
+        coefficients={
+            "intercept": model.intercept_,
+            "square_feet": model.coef_[0],
+            "bedrooms": model.coef_[1],
+            "r2": r2,
+        },
+        property_table=property_analysis,
+        premium_set=premium_property_names,
+        roi=roi,
+    )
+print(f"\nResults stored as run {run_id} in {store.path}")
+
+# Structured copies of the report tables for downstream consumers
+sink = ResultSink(__file__)
+sink.write_table("property_analysis", property_analysis)
+sink.write_table("premium_properties", premium_properties_df)
+sink.write_summary(
+    {
+        "run_id": run_id,
+        "r2": r2,
+        "intercept": model.intercept_,
+        "coef_square_feet": model.coef_[0],
+        "coef_bedrooms": model.coef_[1],
+        "min_leases": min_leases,
+        "premium_properties": premium_property_names,
+        "district": (
+            district_analysis.iloc[0].to_dict() if not district_analysis.empty else None
+        ),
+        "roi": roi,
+    }
+)